@@ -288,7 +288,7 @@ def generate_validation_hash(csv_data: List[dict]) -> str:
     """Generate deterministic hash for validation."""
     sorted_data = sorted(csv_data, key=lambda x: x["tab_number"])
     hash_input = json.dumps(sorted_data, sort_keys=True).encode()
-    return hashlib.sha256(hash_input).hexdigest()[:16]
+    return hashlib.blake2b(hash_input, digest_size=8).hexdigest()
 
 def main():
     parser = argparse.ArgumentParser(description="Build Trial Record Internal Index")
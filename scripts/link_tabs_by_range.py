@@ -8,17 +8,33 @@ import argparse
 import re
 import json
 import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from operator import attrgetter
 from pathlib import Path
 from typing import Dict, List, Tuple, Optional
 import fitz  # PyMuPDF
 import hashlib
 
+from pdf_cache import open_cached_pdf
+
 # Regex patterns for tab detection
 TAB_RX = re.compile(r"(?i)\bTAB(?:\s*NO\.?)?\s*(\d{1,3})\b")
 MARK_RX = re.compile(r"(?i)\*T(\d{1,3})\b")  # asterisk markers
 INDEX_ENTRY_RX = re.compile(r"^\s*(\d{1,3})[\.\s]+(.+?)[\s\.]{2,}(\d+)\s*$")  # "1. Title .. 123"
 
 HEADER_FOOTER_BAND = 0.08  # exclude top/bottom 8% of page
+CSV_ROW_RX = re.compile(r"^\d+,(\d+),\d+,\[([^\]]+)\],(?:True|False)$")  # tabs.csv row
+RECT_TOLERANCE = 0.01  # tabs.csv stores rects rounded to 2 decimals
+
+@dataclass(slots=True)
+class TabHit:
+    """A tab reference found on an index page of the brief."""
+    tab_num: int
+    page: int  # 1-indexed brief page
+    rect: fitz.Rect
+    is_marker: bool
 
 def parse_page_range(page_str: str) -> List[int]:
     """Parse page range string like '2-9' or '2' into list of page numbers."""
@@ -28,22 +44,15 @@ def parse_page_range(page_str: str) -> List[int]:
     else:
         return [int(page_str)]
 
-def get_page_bands(page: fitz.Page) -> Tuple[fitz.Rect, fitz.Rect]:
-    """Get header and footer band rectangles to exclude."""
+def get_band_cutoffs(page: fitz.Page) -> Tuple[float, float]:
+    """Get the y-coordinates bounding the header and footer bands to exclude."""
     rect = page.rect
     band_height = rect.height * HEADER_FOOTER_BAND
-    header_band = fitz.Rect(rect.x0, rect.y0, rect.x1, rect.y0 + band_height)
-    footer_band = fitz.Rect(rect.x0, rect.y1 - band_height, rect.x1, rect.y1)
-    return header_band, footer_band
-
-def is_in_bands(rect: fitz.Rect, bands: List[fitz.Rect]) -> bool:
-    """Check if rectangle intersects with header/footer bands."""
-    return any(rect.intersects(band) for band in bands)
+    return rect.y0 + band_height, rect.y1 - band_height
 
 def extract_index_lines(page: fitz.Page) -> List[Tuple[str, fitz.Rect]]:
     """Extract text lines from index page excluding header/footer bands."""
-    header_band, footer_band = get_page_bands(page)
-    bands = [header_band, footer_band]
+    top_cutoff, bottom_cutoff = get_band_cutoffs(page)
     
     lines = []
     
@@ -52,8 +61,9 @@ def extract_index_lines(page: fitz.Page) -> List[Tuple[str, fitz.Rect]]:
     for block in text_dict.get("blocks", []):
         if block.get("type") == 0:  # text block
             for line in block.get("lines", []):
-                line_rect = fitz.Rect(line["bbox"])
-                if is_in_bands(line_rect, bands):
+                # Plain float comparison on the raw bbox; only kept lines become Rects
+                bbox = line["bbox"]
+                if bbox[1] < top_cutoff or bbox[3] > bottom_cutoff:
                     continue
                 
                 line_text = ""
@@ -61,17 +71,17 @@ def extract_index_lines(page: fitz.Page) -> List[Tuple[str, fitz.Rect]]:
                     line_text += span.get("text", "")
                 
                 if line_text.strip():
-                    lines.append((line_text.strip(), line_rect))
+                    lines.append((line_text.strip(), fitz.Rect(bbox)))
     
     return lines
 
-def extract_tabs_from_index(brief_pdf: fitz.Document, index_pages: List[int], expected_tabs: int) -> Tuple[Dict[int, Tuple[int, fitz.Rect]], Dict[int, bool]]:
+def extract_tabs_from_index(brief_pdf: fitz.Document, index_pages: List[int], expected_tabs: int) -> List[TabHit]:
     """
     Extract tab numbers and clickable rectangles from specified index pages only.
-    Returns: {tab_number: (page_number, rect)}, {tab_number: is_marker}
+    Returns: list of TabHit sorted by tab number
     """
-    found_tabs = {}
-    marker_tabs = {}
+    found_tabs: List[TabHit] = []
+    seen: set[int] = set()
     
     print(f"🔍 Scanning index pages {index_pages} for tabs (expecting {expected_tabs})")
     
@@ -88,9 +98,9 @@ def extract_tabs_from_index(brief_pdf: fitz.Document, index_pages: List[int], ex
             marker_match = MARK_RX.search(text)
             if marker_match:
                 tab_num = int(marker_match.group(1))
-                if 1 <= tab_num <= 999 and tab_num not in found_tabs:
-                    found_tabs[tab_num] = (page_num, rect)  # Keep 1-indexed
-                    marker_tabs[tab_num] = True
+                if 1 <= tab_num <= 999 and tab_num not in seen:
+                    found_tabs.append(TabHit(tab_num, page_num, rect, True))  # Keep 1-indexed
+                    seen.add(tab_num)
                     print(f"  ✨ Found marker *T{tab_num} on index page {page_num}")
                     continue
             
@@ -98,9 +108,9 @@ def extract_tabs_from_index(brief_pdf: fitz.Document, index_pages: List[int], ex
             tab_match = TAB_RX.search(text)
             if tab_match:
                 tab_num = int(tab_match.group(1))
-                if 1 <= tab_num <= 999 and tab_num not in found_tabs:
-                    found_tabs[tab_num] = (page_num, rect)
-                    marker_tabs[tab_num] = False
+                if 1 <= tab_num <= 999 and tab_num not in seen:
+                    found_tabs.append(TabHit(tab_num, page_num, rect, False))
+                    seen.add(tab_num)
                     print(f"  📄 Found Tab {tab_num} on index page {page_num}")
                     continue
             
@@ -111,15 +121,17 @@ def extract_tabs_from_index(brief_pdf: fitz.Document, index_pages: List[int], ex
                 title = index_match.group(2).strip()
                 dest_page = int(index_match.group(3))
                 
-                if 1 <= tab_num <= 999 and tab_num not in found_tabs:
-                    found_tabs[tab_num] = (page_num, rect)
-                    marker_tabs[tab_num] = False
+                if 1 <= tab_num <= 999 and tab_num not in seen:
+                    found_tabs.append(TabHit(tab_num, page_num, rect, False))
+                    seen.add(tab_num)
                     print(f"  🎯 Index Entry Tab {tab_num}: {title} → Page {dest_page}")
         
         # Stop early if we found all expected tabs
         if len(found_tabs) >= expected_tabs:
             break
     
+    found_tabs.sort(key=attrgetter("tab_num"))
+    
     # Validation - warn but don't fail completely
     if len(found_tabs) != expected_tabs:
         if len(found_tabs) < expected_tabs:
@@ -130,12 +142,10 @@ def extract_tabs_from_index(brief_pdf: fitz.Document, index_pages: List[int], ex
             extra = len(found_tabs) - expected_tabs
             print(f"⚠️  Found {extra} extra tabs beyond expected {expected_tabs}")
             # Trim to expected count
-            sorted_tabs = sorted(found_tabs.keys())[:expected_tabs]
-            found_tabs = {k: found_tabs[k] for k in sorted_tabs}
-            marker_tabs = {k: marker_tabs[k] for k in sorted_tabs}
+            del found_tabs[expected_tabs:]
     
     print(f"✅ Successfully extracted {len(found_tabs)} tabs from index")
-    return found_tabs, marker_tabs
+    return found_tabs
 
 def find_trial_destinations(trial_pdf: fitz.Document, tab_numbers: List[int]) -> Dict[int, int]:
     """
@@ -145,8 +155,9 @@ def find_trial_destinations(trial_pdf: fitz.Document, tab_numbers: List[int]) ->
     print(f"🎯 Finding destinations in Trial Record for {len(tab_numbers)} tabs")
     
     destinations = {}
+    remaining = set(tab_numbers)
     
-    # Scan entire Trial Record for tab destinations
+    # Scan Trial Record for tab destinations, stopping once every tab is resolved
     for page_num in range(trial_pdf.page_count):
         page = trial_pdf[page_num]
         page_text = page.get_text()
@@ -154,8 +165,9 @@ def find_trial_destinations(trial_pdf: fitz.Document, tab_numbers: List[int]) ->
         # Check for asterisk markers first
         for marker_match in MARK_RX.finditer(page_text):
             tab_num = int(marker_match.group(1))
-            if tab_num in tab_numbers and tab_num not in destinations:
+            if tab_num in remaining:
                 destinations[tab_num] = page_num + 1  # 1-indexed
+                remaining.discard(tab_num)
                 print(f"  ✨ Found marker destination *T{tab_num} on TR page {page_num + 1}")
         
         # Check for standard Tab patterns (only at top of page)
@@ -164,44 +176,103 @@ def find_trial_destinations(trial_pdf: fitz.Document, tab_numbers: List[int]) ->
         
         for tab_match in TAB_RX.finditer(top_text):
             tab_num = int(tab_match.group(1))
-            if tab_num in tab_numbers and tab_num not in destinations:
+            if tab_num in remaining:
                 destinations[tab_num] = page_num + 1  # 1-indexed
+                remaining.discard(tab_num)
                 print(f"  📄 Found Tab {tab_num} destination on TR page {page_num + 1}")
+        
+        if not remaining:
+            break
     
     # Report missing destinations
-    missing = set(tab_numbers) - set(destinations.keys())
-    if missing:
-        print(f"⚠️  Missing destinations for tabs: {sorted(missing)}")
+    if remaining:
+        print(f"⚠️  Missing destinations for tabs: {sorted(remaining)}")
     
     print(f"✅ Resolved {len(destinations)}/{len(tab_numbers)} tab destinations")
     return destinations
 
+def is_master_current(master_path: str, brief_pdf: fitz.Document, trial_pdf: fitz.Document) -> bool:
+    """Check whether an existing Master PDF is newer than both inputs and has their page count."""
+    if not os.path.exists(master_path) or not brief_pdf.name or not trial_pdf.name:
+        return False
+    
+    master_mtime = os.path.getmtime(master_path)
+    if master_mtime <= max(os.path.getmtime(brief_pdf.name), os.path.getmtime(trial_pdf.name)):
+        return False
+    
+    with fitz.open(master_path) as existing:
+        return len(existing) == len(brief_pdf) + len(trial_pdf)
+
+def load_previous_tab_rects(csv_path: str) -> Optional[Dict[int, List[fitz.Rect]]]:
+    """Read the link rectangles a previous run wrote to tabs.csv, keyed by 0-indexed brief page."""
+    if not os.path.exists(csv_path):
+        return None
+    
+    rects_by_page: Dict[int, List[fitz.Rect]] = defaultdict(list)
+    with open(csv_path) as f:
+        next(f, None)  # header
+        for line in f:
+            row_match = CSV_ROW_RX.match(line.strip())
+            if not row_match:
+                return None
+            brief_page = int(row_match.group(1))
+            coords = map(float, row_match.group(2).split(","))
+            rects_by_page[brief_page - 1].append(fitz.Rect(*coords))
+    return rects_by_page
+
+def wipe_tab_links(master: fitz.Document, previous_rects: Dict[int, List[fitz.Rect]]) -> None:
+    """Remove the GoTo links a previous run created, leaving the brief's own links in place."""
+    for page_index, rects in previous_rects.items():
+        if page_index >= len(master):
+            continue
+        page = master[page_index]
+        for link in page.get_links():
+            if link.get("kind") != fitz.LINK_GOTO:
+                continue
+            link_rect = link["from"]
+            if any(all(abs(a - b) <= RECT_TOLERANCE for a, b in zip(link_rect, rect)) for rect in rects):
+                page.delete_link(link)
+
 def create_master_pdf(brief_pdf: fitz.Document, trial_pdf: fitz.Document, 
-                     tabs: Dict[int, Tuple[int, fitz.Rect]], 
+                     tabs: List[TabHit], 
                      destinations: Dict[int, int],
-                     marker_info: Dict[int, bool],
                      output_dir: str) -> Dict:
     """Create Master PDF with hyperlinks and generate all output files."""
     
-    # Create Master PDF by combining brief + trial record
-    master = fitz.open()
-    master.insert_pdf(brief_pdf)
+    os.makedirs(output_dir, exist_ok=True)
+    master_path = os.path.join(output_dir, "Master.TabsRange.linked.pdf")
     brief_page_count = len(brief_pdf)
-    master.insert_pdf(trial_pdf)
+    
+    # Reuse an up-to-date Master PDF and only rewrite the links the last run added
+    previous_rects = load_previous_tab_rects(os.path.join(output_dir, "tabs.csv"))
+    incremental = previous_rects is not None and is_master_current(master_path, brief_pdf, trial_pdf)
+    if incremental:
+        master = fitz.open(master_path)
+        wipe_tab_links(master, previous_rects)
+        print(f"♻️  Reusing existing Master PDF, updating links only")
+    else:
+        # Create Master PDF by combining brief + trial record
+        master = fitz.open()
+        master.insert_pdf(brief_pdf)
+        master.insert_pdf(trial_pdf)
     
     # Create hyperlinks
     links_created = 0
     broken_links = 0
     csv_data = []
+    links_by_page = defaultdict(list)
     
     print(f"🔗 Creating hyperlinks in Master PDF...")
     
-    for tab_num in sorted(tabs.keys()):
-        brief_page, source_rect = tabs[tab_num]
+    for tab in tabs:  # already sorted by tab number
+        tab_num = tab.tab_num
+        brief_page = tab.page
+        source_rect = tab.rect
+        tr_dest_page = destinations.get(tab_num)
         
-        if tab_num in destinations:
+        if tr_dest_page is not None:
             # Calculate destination page in Master PDF (brief pages + TR page - 1)
-            dest_page = brief_page_count + destinations[tab_num] - 1
+            dest_page = brief_page_count + tr_dest_page - 1
             
             # Validate destination exists
             if dest_page >= len(master):
@@ -209,36 +280,41 @@ def create_master_pdf(brief_pdf: fitz.Document, trial_pdf: fitz.Document,
                 print(f"❌ Broken link: Tab {tab_num} points to page {dest_page} but Master PDF only has {len(master)} pages")
                 continue
             
-            # Create hyperlink
-            source_page = master[brief_page - 1]  # Convert to 0-indexed
-            link_dict = {
+            # Queue hyperlink for its source page (0-indexed)
+            links_by_page[brief_page - 1].append({
                 "kind": fitz.LINK_GOTO,
                 "from": source_rect,
                 "page": dest_page,
                 "zoom": 0
-            }
-            source_page.insert_link(link_dict)
+            })
             links_created += 1
             
             # Store for CSV
             csv_data.append({
                 "tab_number": tab_num,
                 "brief_page": brief_page,
-                "tr_dest_page": destinations[tab_num],
+                "tr_dest_page": tr_dest_page,
                 "rect": f"[{source_rect.x0:.2f},{source_rect.y0:.2f},{source_rect.x1:.2f},{source_rect.y1:.2f}]",
-                "is_marker": marker_info.get(tab_num, False)
+                "is_marker": tab.is_marker
             })
             
-            marker_text = " (marker)" if marker_info.get(tab_num, False) else ""
-            print(f"  🔗 Tab {tab_num}{marker_text}: brief p.{brief_page} → TR p.{destinations[tab_num]}")
+            marker_text = " (marker)" if tab.is_marker else ""
+            print(f"  🔗 Tab {tab_num}{marker_text}: brief p.{brief_page} → TR p.{tr_dest_page}")
         else:
             broken_links += 1
             print(f"❌ No destination found for Tab {tab_num}")
     
-    # Save Master PDF
-    os.makedirs(output_dir, exist_ok=True)
-    master_path = os.path.join(output_dir, "Master.TabsRange.linked.pdf")
-    master.save(master_path)
+    # Write links one source page at a time so each page is loaded once
+    for page_index, page_links in links_by_page.items():
+        source_page = master[page_index]
+        for link_dict in page_links:
+            source_page.insert_link(link_dict)
+    
+    # Save Master PDF (append-only update when the combined pages are unchanged)
+    if incremental:
+        master.save(master_path, incremental=True, encryption=fitz.PDF_ENCRYPT_KEEP)
+    else:
+        master.save(master_path)
     master.close()
     
     # Save CSV
@@ -276,7 +352,7 @@ def create_master_pdf(brief_pdf: fitz.Document, trial_pdf: fitz.Document,
         "links_created": links_created,
         "broken_links": broken_links,
         "success": broken_links == 0,
-        "markers_used": sum(1 for is_marker in marker_info.values() if is_marker),
+        "markers_used": sum(1 for tab in tabs if tab.is_marker),
         "validation_hash": generate_validation_hash(csv_data)
     }
     
@@ -295,9 +371,9 @@ def generate_validation_hash(csv_data: List[dict]) -> str:
     """Generate deterministic hash for validation."""
     sorted_data = sorted(csv_data, key=lambda x: x["tab_number"])
     hash_input = json.dumps(sorted_data, sort_keys=True).encode()
-    return hashlib.sha256(hash_input).hexdigest()[:16]
+    return hashlib.blake2b(hash_input, digest_size=8).hexdigest()
 
-def main():
+def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description="Index-Only Tab Linking")
     parser.add_argument("--brief", required=True, help="Brief document PDF path")
     parser.add_argument("--trial", required=True, help="Trial Record PDF path")
@@ -306,9 +382,10 @@ def main():
     parser.add_argument("--out_dir", required=True, help="Output directory")
     parser.add_argument("--index_only", action="store_true", help="Use index-only mode")
     parser.add_argument("--review_json", action="store_true", help="Generate review.json")
-    
-    args = parser.parse_args()
-    
+    return parser
+
+def run_pipeline(args: argparse.Namespace) -> Dict:
+    """Run the full index-only linking pipeline for one brief/trial pair and return its validation."""
     # Parse page range
     index_pages = parse_page_range(args.index_pages)
     
@@ -317,19 +394,54 @@ def main():
     print(f"📋 Trial: {os.path.basename(args.trial)}")
     print(f"🔍 Index pages: {index_pages}")
     
-    # Open documents
-    brief_pdf = fitz.open(args.brief)
-    trial_pdf = fitz.open(args.trial)
+    # Open documents (shared cached handles; not closed here)
+    brief_pdf = open_cached_pdf(args.brief)
+    trial_pdf = open_cached_pdf(args.trial)
+    
+    # Extract tabs from index pages only
+    tabs = extract_tabs_from_index(brief_pdf, index_pages, args.expected_tabs)
+    
+    # Find destinations in trial record
+    destinations = find_trial_destinations(trial_pdf, [tab.tab_num for tab in tabs])
     
+    # Create Master PDF with hyperlinks
+    return create_master_pdf(brief_pdf, trial_pdf, tabs, destinations, args.out_dir)
+
+def _run_pair(pair: Dict) -> Dict:
+    """Worker entry point: run the pipeline for one case, reporting errors instead of raising."""
+    args = build_parser().parse_args([
+        "--brief", pair["brief"],
+        "--trial", pair["trial"],
+        "--index_pages", str(pair["index_pages"]),
+        "--expected_tabs", str(pair["expected_tabs"]),
+        "--out_dir", pair["out_dir"],
+    ])
     try:
-        # Extract tabs from index pages only
-        tabs, marker_info = extract_tabs_from_index(brief_pdf, index_pages, args.expected_tabs)
-        
-        # Find destinations in trial record
-        destinations = find_trial_destinations(trial_pdf, list(tabs.keys()))
-        
-        # Create Master PDF with hyperlinks
-        validation = create_master_pdf(brief_pdf, trial_pdf, tabs, destinations, marker_info, args.out_dir)
+        return run_pipeline(args)
+    except Exception as e:
+        print(f"\n❌ Error processing {os.path.basename(args.brief)}: {e}")
+        return {"success": False, "error": str(e)}
+
+def main_batch(pairs: List[Dict]) -> List[Dict]:
+    """
+    Run the pipeline on several brief/trial pairs in parallel, one process per case.
+    Each pair needs: brief, trial, index_pages, expected_tabs, out_dir.
+    Returns validation results in the same order as `pairs`.
+    """
+    if not pairs:
+        return []
+    
+    max_workers = min(os.cpu_count() or 1, len(pairs))
+    print(f"🚀 Processing {len(pairs)} cases with {max_workers} workers")
+    
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(_run_pair, pairs))
+
+def main():
+    args = build_parser().parse_args()
+    
+    try:
+        validation = run_pipeline(args)
         
         if validation["success"]:
             print("\n🎉 SUCCESS! Index-only linking completed with 0 broken links.")
@@ -341,9 +453,6 @@ def main():
     except Exception as e:
         print(f"\n❌ Error: {e}")
         return 1
-    finally:
-        brief_pdf.close()
-        trial_pdf.close()
 
 if __name__ == "__main__":
     exit(main())
\ No newline at end of file
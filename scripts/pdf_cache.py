@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+Shared PDF document cache for the linking scripts.
+Lets the link steps reuse one parsed document when run in the same process.
+"""
+
+import os
+from typing import Dict, Tuple
+
+import fitz  # PyMuPDF
+
+# One open document per path, with the modification time it was opened at
+_open_docs: Dict[str, Tuple[int, fitz.Document]] = {}
+
+
+def open_cached_pdf(path: str) -> fitz.Document:
+    """Open a PDF once per path; a changed file on disk closes the stale handle and gets a fresh one.
+
+    Cached documents are shared read-only, so callers must not modify or close them.
+    """
+    path = os.path.abspath(path)
+    mtime = os.stat(path).st_mtime_ns
+    cached = _open_docs.get(path)
+    if cached is not None:
+        cached_mtime, doc = cached
+        if cached_mtime == mtime:
+            return doc
+        doc.close()
+    doc = fitz.open(path)
+    _open_docs[path] = (mtime, doc)
+    return doc
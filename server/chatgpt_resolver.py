@@ -55,9 +55,11 @@ async def root():
     }
 
 @app.post("/resolve", response_model=ResolutionResponse)
-async def resolve_hyperlink(request: ResolutionRequest):
+def resolve_hyperlink(request: ResolutionRequest):
     """
-    Resolve hyperlink ambiguity using ChatGPT API with exact deterministic prompt
+    Resolve hyperlink ambiguity using ChatGPT API with exact deterministic prompt.
+    Declared sync so FastAPI runs the blocking requests.post in its threadpool
+    instead of stalling the event loop.
     """
     
     # Check if OpenAI API key is available
@@ -12,21 +12,51 @@ from typing import List, Dict, Tuple, Optional, Any
 from dataclasses import dataclass, asdict
 import requests
 import os
+import threading
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import repeat
 
-@dataclass
+# Below this many pages, process start-up outweighs parallel extraction
+PARALLEL_PAGE_THRESHOLD = 32
+# PyMuPDF page parsing stops scaling past a handful of processes; FERRANTE_PAGE_WORKERS overrides
+MAX_PAGE_WORKERS = int(os.environ.get('FERRANTE_PAGE_WORKERS', '6'))
+
+# Maximum in-flight ChatGPT API requests during ambiguity resolution
+LLM_MAX_CONCURRENCY = 15
+
+# search_for flag fallbacks, and the letter pairs that fonts commonly render as ligatures
+_FALLBACK_SEARCH_FLAGS = (
+    fitz.TEXT_PRESERVE_LIGATURES,
+    fitz.TEXT_PRESERVE_WHITESPACE,
+    fitz.TEXT_PRESERVE_LIGATURES | fitz.TEXT_PRESERVE_WHITESPACE,
+    0  # Default
+)
+_PLAIN_SEARCH_FLAGS = (0,)
+_LIGATURE_PAIRS = ('ff', 'fi', 'fl', 'ft', 'st')
+
+# Shared link target point (top-left of the destination page)
+_LINK_ORIGIN = fitz.Point(0, 0)
+
+_WHITESPACE_RUN = re.compile(r'\s+')
+
+# Plain text extraction for regex/substring scanning: no ligature or whitespace preservation
+_SCAN_TEXT_FLAGS = fitz.TEXT_MEDIABOX_CLIP
+
+@dataclass(slots=True)
 class Rectangle:
     x0: float
     y0: float
     x1: float
     y1: float
 
-@dataclass
+@dataclass(slots=True)
 class DestinationCandidate:
     dest_page: int
     confidence: float
     method: str
 
-@dataclass
+@dataclass(slots=True)
 class HyperlinkReference:
     source_file: str
     source_page: int
@@ -55,11 +85,47 @@ class DeterministicHyperlinkDetector:
         'tr_cite': re.compile(r'\b(?:TR|Trial\s+Record)\s*(?:p\.|pp\.|page|pages)?\s*(\d{1,4})\b', re.IGNORECASE)
     }
     
+    # Every pattern starts with \b and a keyword: one scan for the keywords finds all candidate starts.
+    # (?<!\w) is \b before a letter; the lookahead on initials lets most positions fail fast.
+    TRIGGER_PATTERN = re.compile(
+        r'(?<!\w)(?=[aerstu])(?:(?P<exhibit>exhibit)|(?P<tab>tab)|(?P<schedule>schedule)|(?P<affidavit>affidavit)'
+        r'|(?P<under>under)|(?P<refusal>refusal)|(?P<tr>tr))',
+        re.IGNORECASE
+    )
+    TRIGGER_TYPES = {
+        'exhibit': ('exhibit',),
+        'tab': ('tab',),
+        'schedule': ('schedule',),
+        'affidavit': ('affidavit',),
+        'under': ('undertaking', 'under_advisement'),
+        'refusal': ('refusal',),
+        'tr': ('tr_cite',)
+    }
+    
+    # TR index: fixed terms whose presence gates a match, and value tokens following a keyword
+    TR_TERMS = ('exhibit', 'affidavit', 'undertaking', 'refusal', 'under advisement')
+    TR_VALUE_PATTERNS = {
+        'exhibit': re.compile(r'(?=exhibit ([^\s:]+)[: ])'),  # exact "exhibit {v}:" / "exhibit {v} "
+        'tab': re.compile(r'(?=tab (\S+))'),
+        'schedule': re.compile(r'(?=schedule (\S+))'),
+    }
+    # Types matched by value prefix, indexed up to the longest value PATTERNS can capture
+    TR_PREFIX_TYPES = ('tab', 'schedule')
+    TR_VALUE_PREFIX_LEN = 3
+    
     # Method priority order for tie-breaking
     METHOD_ORDER = [
         'exact_exhibit', 'exact_tab', 'exact_schedule', 'exact_affidavit',
         'token_affidavit', 'token_exhibit', 'section_match'
     ]
+    METHOD_RANK = {method: rank for rank, method in enumerate(METHOD_ORDER)}
+    
+    # Candidate map CSV columns
+    CANDIDATE_CSV_HEADER = (
+        'source_file', 'source_page', 'ref_type', 'ref_value', 'snippet',
+        'rects_count', 'top_dest_page', 'top_confidence', 'top_method',
+        'llm_decision', 'deterministic_hash'
+    )
     
     # System prompt for ChatGPT API (exact specification)
     SYSTEM_PROMPT = """Role: Hyperlink Orchestrator (Deterministic).
@@ -72,54 +138,119 @@ Rules:
 Prohibited: speculation, external links, references to any pages not in candidates.
 Temperature: 0. Top_p: 1."""
 
-    def __init__(self, output_dir: str = "workspace/exports/ferrante"):
+    def __init__(self, output_dir: str = "workspace/exports/ferrante", llm_cache_dir: Optional[str] = None,
+                 page_workers: Optional[int] = None):
         self.output_dir = Path(output_dir)
+        # Processes for page-level extraction on large PDFs; 1 keeps it in-process
+        # (e.g. when the caller already runs several pipelines in parallel processes)
+        self.page_workers = min(os.cpu_count() or 1, MAX_PAGE_WORKERS) if page_workers is None else page_workers
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        # Deterministic API settings make responses cacheable by input
+        self.llm_cache_dir = Path(llm_cache_dir) if llm_cache_dir else self.output_dir / "llm_cache"
+        self.llm_cache_dir.mkdir(parents=True, exist_ok=True)
         self.trial_record_index = {}
+        self.tr_term_pages = {}
+        self.tr_value_pages = {}
+        self.tr_prefix_pages = {}
+        self._candidate_cache = {}
+        self._brief_offsets = {}
+        self._broken_links = 0
+        # LLM calls in the last run that fell back to needs_review (no API key, request failure)
+        self.llm_fallbacks = 0
+        self._source_docs: Dict[str, fitz.Document] = {}
+        
+    def _source_doc(self, pdf_path: str) -> fitz.Document:
+        """Open a source PDF once per run; later steps reuse the already-parsed document"""
+        doc = self._source_docs.get(pdf_path)
+        if doc is None:
+            doc = self._source_docs[pdf_path] = fitz.open(pdf_path)
+        return doc
+    
+    def _close_source_docs(self):
+        """Release the source PDFs opened during this run"""
+        for doc in self._source_docs.values():
+            doc.close()
+        self._source_docs = {}
         
     def step_1_extract_deterministic(self, pdf_path: str, filename: str) -> List[HyperlinkReference]:
         """1) Extract text & rectangles deterministically (non-LLM)"""
         print(f"🔍 Extracting references from {filename}...")
         
         references = []
-        doc = fitz.open(pdf_path)
+        doc = self._source_doc(pdf_path)
+        page_count = len(doc)
+        
+        if page_count < PARALLEL_PAGE_THRESHOLD or self.page_workers <= 1:
+            for page_num in range(page_count):
+                references.extend(self._extract_page_references(doc[page_num], page_num, filename))
+        else:
+            # Pages are independent; extract across processes and merge in page order
+            workers = self.page_workers
+            chunksize = max(1, page_count // (4 * workers))
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                for page_refs in executor.map(_extract_page_refs, repeat(pdf_path), range(page_count),
+                                              repeat(filename), chunksize=chunksize):
+                    references.extend(page_refs)
         
-        for page_num in range(len(doc)):
-            page = doc[page_num]
-            page_text = page.get_text()
-            
-            # Apply regex patterns deterministically
-            for ref_type, pattern in self.PATTERNS.items():
-                for match in pattern.finditer(page_text):
-                    ref_value = match.group(1) if match.lastindex else match.group(0)
-                    
-                    # Find rectangles with deterministic fallbacks
-                    needle = self._create_needle(ref_type, ref_value, match.group(0))
-                    rects = self._find_rectangles_deterministic(page, needle)
-                    
-                    # Get context snippet
-                    snippet = self._get_context_snippet(page_text, match.start(), 60)
-                    
-                    reference = HyperlinkReference(
-                        source_file=filename,
-                        source_page=page_num + 1,
-                        ref_type=ref_type,
-                        ref_value=ref_value,
-                        snippet=snippet,
-                        rects=rects,
-                        candidates=[],
-                        top_dest_page=0,
-                        top_confidence=0.0,
-                        top_method=""
-                    )
-                    
-                    references.append(reference)
-        
-        doc.close()
         print(f"   ✅ Found {len(references)} references")
         return references
     
-    def _create_needle(self, ref_type: str, ref_value: str, full_match: str) -> str:
+    @classmethod
+    def _extract_page_references(cls, page: fitz.Page, page_num: int, filename: str) -> List[HyperlinkReference]:
+        """Extract references from a single page"""
+        references = []
+        page_text = page.get_text("text", sort=False, flags=_SCAN_TEXT_FLAGS)
+        
+        # Apply all regex patterns deterministically
+        for ref_type, matches in cls._match_patterns(page_text).items():
+            for match in matches:
+                ref_value = match.group(1) if match.lastindex else match.group(0)
+                
+                # Find rectangles with deterministic fallbacks
+                needle = cls._create_needle(ref_type, ref_value, match.group(0))
+                rects = cls._find_rectangles_deterministic(page, needle)
+                
+                # Get context snippet
+                snippet = cls._get_context_snippet(page_text, match.start(), 60)
+                
+                reference = HyperlinkReference(
+                    source_file=filename,
+                    source_page=page_num + 1,
+                    ref_type=ref_type,
+                    ref_value=ref_value,
+                    snippet=snippet,
+                    rects=rects,
+                    candidates=[],
+                    top_dest_page=0,
+                    top_confidence=0.0,
+                    top_method=""
+                )
+                
+                references.append(reference)
+        
+        return references
+    
+    @classmethod
+    def _match_patterns(cls, page_text: str) -> Dict[str, List[re.Match]]:
+        """Per-type PATTERNS matches, identical to running each pattern's finditer, in one text scan"""
+        matches_by_type = {ref_type: [] for ref_type in cls.PATTERNS}
+        match_ends = dict.fromkeys(cls.PATTERNS, 0)
+        
+        for trigger in cls.TRIGGER_PATTERN.finditer(page_text):
+            start = trigger.start()
+            for ref_type in cls.TRIGGER_TYPES[trigger.lastgroup]:
+                # finditer never starts a match inside the same pattern's previous match
+                if start < match_ends[ref_type]:
+                    continue
+                match = cls.PATTERNS[ref_type].match(page_text, start)
+                if match:
+                    matches_by_type[ref_type].append(match)
+                    match_ends[ref_type] = match.end()
+        
+        return matches_by_type
+    
+    @staticmethod
+    def _create_needle(ref_type: str, ref_value: str, full_match: str) -> str:
         """Create search needle for rectangle detection"""
         if ref_type == 'exhibit':
             return f"Exhibit {ref_value}"
@@ -132,18 +263,20 @@ Temperature: 0. Top_p: 1."""
         else:
             return full_match
     
-    def _find_rectangles_deterministic(self, page: fitz.Page, needle: str) -> List[Rectangle]:
+    @staticmethod
+    def _find_rectangles_deterministic(page: fitz.Page, needle: str) -> List[Rectangle]:
         """Find rectangles with case/ligature/dehyphenation fallbacks"""
         rectangles = []
         
-        # Try variations in deterministic order
-        variations = [needle, needle.lower(), needle.upper(), needle.title()]
-        flag_combinations = [
-            fitz.TEXT_PRESERVE_LIGATURES,
-            fitz.TEXT_PRESERVE_WHITESPACE,
-            fitz.TEXT_PRESERVE_LIGATURES | fitz.TEXT_PRESERVE_WHITESPACE,
-            0  # Default
-        ]
+        # Try distinct variations in deterministic order
+        variations = list(dict.fromkeys([needle, needle.lower(), needle.upper(), needle.title()]))
+        
+        # Ligature/whitespace flags cannot change hits for plain ASCII needles without ligature pairs
+        needle_lower = needle.lower()
+        if needle.isascii() and not any(pair in needle_lower for pair in _LIGATURE_PAIRS):
+            flag_combinations = _PLAIN_SEARCH_FLAGS
+        else:
+            flag_combinations = _FALLBACK_SEARCH_FLAGS
         
         for variation in variations:
             for flags in flag_combinations:
@@ -154,19 +287,19 @@ Temperature: 0. Top_p: 1."""
             if rectangles:
                 break
         
-        # Remove duplicates deterministically
+        # Remove duplicates deterministically (1-unit grid on the top-left corner)
         unique_rects = []
+        seen = set()
         for rect in rectangles:
-            is_duplicate = any(
-                abs(rect.x0 - ur.x0) < 1 and abs(rect.y0 - ur.y0) < 1 
-                for ur in unique_rects
-            )
-            if not is_duplicate:
+            key = (int(rect.x0), int(rect.y0))
+            if key not in seen:
+                seen.add(key)
                 unique_rects.append(rect)
         
         return unique_rects
     
-    def _get_context_snippet(self, text: str, match_index: int, context_length: int) -> str:
+    @staticmethod
+    def _get_context_snippet(text: str, match_index: int, context_length: int) -> str:
         """Extract context around the match"""
         start = max(0, match_index - context_length)
         end = min(len(text), match_index + context_length)
@@ -176,22 +309,52 @@ Temperature: 0. Top_p: 1."""
         """2) Build TR index deterministically (non-LLM)"""
         print("🗂️  Building Trial Record index...")
         
-        doc = fitz.open(trial_record_path)
+        doc = self._source_doc(trial_record_path)
+        page_count = len(doc)
+        
+        if page_count < PARALLEL_PAGE_THRESHOLD or self.page_workers <= 1:
+            page_texts = [self._normalized_page_text(doc[page_num]) for page_num in range(page_count)]
+        else:
+            # Pages are independent; extract and normalize across processes
+            workers = self.page_workers
+            chunksize = max(1, page_count // (4 * workers))
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                page_texts = list(executor.map(_index_tr_page, repeat(trial_record_path), range(page_count),
+                                               chunksize=chunksize))
+        
         index = {}
+        term_pages = {term: set() for term in self.TR_TERMS}
+        value_pages = {ref_type: {} for ref_type in self.TR_VALUE_PATTERNS}
+        prefix_pages = {ref_type: {} for ref_type in self.TR_PREFIX_TYPES}
         
-        for page_num in range(len(doc)):
-            page = doc[page_num]
-            page_text = page.get_text().lower()
-            
-            # Normalize whitespace and store
-            normalized_text = ' '.join(page_text.split())
+        for page_num, normalized_text in enumerate(page_texts):
             index[page_num + 1] = normalized_text
+            
+            # Inverted indexes so scoring never rescans every page per reference
+            for term, pages in term_pages.items():
+                if term in normalized_text:
+                    pages.add(page_num + 1)
+            for ref_type, pattern in self.TR_VALUE_PATTERNS.items():
+                for match in pattern.finditer(normalized_text):
+                    token = match.group(1)
+                    value_pages[ref_type].setdefault(token, set()).add(page_num + 1)
+                    if ref_type in prefix_pages:
+                        for length in range(1, min(len(token), self.TR_VALUE_PREFIX_LEN) + 1):
+                            prefix_pages[ref_type].setdefault(token[:length], set()).add(page_num + 1)
         
-        doc.close()
         self.trial_record_index = index
+        self.tr_term_pages = term_pages
+        self.tr_value_pages = value_pages
+        self.tr_prefix_pages = prefix_pages
+        self._candidate_cache = {}
         print(f"   ✅ Indexed {len(index)} pages")
         return index
     
+    @staticmethod
+    def _normalized_page_text(page: fitz.Page) -> str:
+        """Lower-cased page text with whitespace runs collapsed to single spaces"""
+        return _WHITESPACE_RUN.sub(' ', page.get_text("text", sort=False, flags=_SCAN_TEXT_FLAGS)).strip().lower()
+    
     def step_3_score_deterministic(self, references: List[HyperlinkReference]) -> List[HyperlinkReference]:
         """3) Score & tie-break deterministically (non-LLM)"""
         print("🎯 Scoring candidates deterministically...")
@@ -211,71 +374,90 @@ Temperature: 0. Top_p: 1."""
     
     def _score_candidates_deterministic(self, reference: HyperlinkReference) -> List[DestinationCandidate]:
         """Score all candidates using exact specification rules"""
-        candidates = []
         ref_type = reference.ref_type
         ref_value = reference.ref_value.lower()
         
-        for page_num, page_text in self.trial_record_index.items():
-            confidence, method = self._calculate_confidence_deterministic(ref_type, ref_value, page_text)
-            
-            if confidence > 0:
-                candidate = DestinationCandidate(page_num, confidence, method)
-                candidates.append(candidate)
+        # Identical references always score identically
+        cache_key = (ref_type, ref_value)
+        cached = self._candidate_cache.get(cache_key)
+        if cached is not None:
+            return list(cached)
+        
+        candidates = [
+            DestinationCandidate(page_num, confidence, method)
+            for page_num, (confidence, method) in self._match_pages_deterministic(ref_type, ref_value).items()
+        ]
         
         # Apply deterministic tie-breakers exactly as specified
         candidates.sort(key=lambda x: (
             -x.confidence,  # Higher score wins
             x.dest_page,    # Lower page wins ties
-            self.METHOD_ORDER.index(x.method) if x.method in self.METHOD_ORDER else 999
+            self.METHOD_RANK.get(x.method, 999)
         ))
         
-        return candidates[:3]  # Top 3
+        top_candidates = candidates[:3]  # Top 3
+        self._candidate_cache[cache_key] = top_candidates
+        return list(top_candidates)
     
-    def _calculate_confidence_deterministic(self, ref_type: str, ref_value: str, page_text: str) -> Tuple[float, str]:
-        """Calculate confidence using exact specification rules"""
+    def _pages_with_value(self, ref_type: str, value_prefix: str) -> set:
+        """Pages where '<keyword> {value_prefix}' occurs, via the TR value index"""
+        if len(value_prefix) <= self.TR_VALUE_PREFIX_LEN:
+            return self.tr_prefix_pages[ref_type].get(value_prefix, set())
+        
+        pages = set()
+        for token, token_pages in self.tr_value_pages.get(ref_type, {}).items():
+            if token.startswith(value_prefix):
+                pages |= token_pages
+        return pages
+    
+    def _match_pages_deterministic(self, ref_type: str, ref_value: str) -> Dict[int, Tuple[float, str]]:
+        """Calculate confidence per matching TR page using exact specification rules"""
+        matches = {}
         
         if ref_type == 'exhibit':
             # Exact phrase matching
-            exact_patterns = [f"exhibit {ref_value}:", f"exhibit {ref_value} ", f"exhibit {ref_value}\n"]
-            for pattern in exact_patterns:
-                if pattern in page_text:
-                    return 1.0, "exact_exhibit"
+            for page_num in self.tr_value_pages['exhibit'].get(ref_value, ()):
+                matches[page_num] = (1.0, "exact_exhibit")
             
             # Token fallback
-            if "exhibit" in page_text and ref_value in page_text:
-                return 0.85, "token_exhibit"
+            for page_num in self.tr_term_pages['exhibit']:
+                if page_num not in matches and ref_value in self.trial_record_index[page_num]:
+                    matches[page_num] = (0.85, "token_exhibit")
                 
         elif ref_type == 'tab':
-            if f"tab {ref_value}" in page_text:
-                return 1.0, "exact_tab"
+            for page_num in self._pages_with_value('tab', ref_value):
+                matches[page_num] = (1.0, "exact_tab")
                 
         elif ref_type == 'schedule':
-            if f"schedule {ref_value}" in page_text:
-                return 1.0, "exact_schedule"
+            for page_num in self._pages_with_value('schedule', ref_value):
+                matches[page_num] = (1.0, "exact_schedule")
                 
         elif ref_type == 'affidavit':
-            name_lower = ref_value.lower()
-            if f"affidavit of {name_lower}" in page_text:
-                return 1.0, "exact_affidavit"
+            exact_phrase = f"affidavit of {ref_value}"
+            name_parts = [part for part in ref_value.split() if len(part) > 2]
             
-            # Token matching with name parts
-            name_parts = name_lower.split()
-            if "affidavit" in page_text and any(part in page_text for part in name_parts if len(part) > 2):
-                return 0.90, "token_affidavit"
+            for page_num in self.tr_term_pages['affidavit']:
+                page_text = self.trial_record_index[page_num]
+                if exact_phrase in page_text:
+                    matches[page_num] = (1.0, "exact_affidavit")
+                # Token matching with name parts
+                elif any(part in page_text for part in name_parts):
+                    matches[page_num] = (0.90, "token_affidavit")
                 
         elif ref_type in ['undertaking', 'refusal', 'under_advisement']:
             section_term = ref_type.replace('_', ' ')
-            if section_term in page_text:
-                return 0.80, "section_match"
+            for page_num in self.tr_term_pages[section_term]:
+                matches[page_num] = (0.80, "section_match")
                 
         elif ref_type == 'tr_cite':
             try:
-                page_num = int(ref_value)
-                return 1.0, "direct_cite"
-            except:
+                int(ref_value)
+                # A direct cite matches every page
+                matches = {page_num: (1.0, "direct_cite") for page_num in self.trial_record_index}
+            except ValueError:
                 pass
         
-        return 0.0, "no_match"
+        return matches
     
     def step_4_llm_resolve(self, references: List[HyperlinkReference], min_confidence: float = 0.92) -> List[HyperlinkReference]:
         """4) Use ChatGPT API for ambiguity resolution (deterministic)"""
@@ -283,8 +465,14 @@ Temperature: 0. Top_p: 1."""
         
         ambiguous_refs = [r for r in references if r.top_confidence < min_confidence and r.candidates]
         
-        for reference in ambiguous_refs:
-            decision = self._call_chatgpt_api(reference, min_confidence)
+        # Calls are independent; overlap their network round-trips
+        decisions = []
+        if ambiguous_refs:
+            with ThreadPoolExecutor(max_workers=min(LLM_MAX_CONCURRENCY, len(ambiguous_refs))) as executor:
+                decisions = list(executor.map(lambda r: self._call_chatgpt_api(r, min_confidence), ambiguous_refs))
+        self.llm_fallbacks = sum(1 for decision in decisions if decision.get('fallback'))
+        
+        for reference, decision in zip(ambiguous_refs, decisions):
             reference.llm_decision = decision.get('decision', 'needs_review')
             
             if decision.get('decision') == 'pick':
@@ -331,11 +519,47 @@ Temperature: 0. Top_p: 1."""
         api_key = os.getenv('OPENAI_API_KEY')
         if not api_key:
             print("   ⚠️  OpenAI API key not found, using deterministic fallback")
-            return {"decision": "needs_review"}
+            return {"decision": "needs_review", "fallback": True}
         
         # Use GPT-5 with Responses API for deterministic results
         model_id = os.getenv('OPENAI_MODEL', 'gpt-5')
         
+        cache_key = hashlib.sha256(
+            json.dumps({"model": model_id, "input": input_data}, sort_keys=True).encode()
+        ).hexdigest()
+        cached = self._load_cached_decision(cache_key)
+        if cached is not None:
+            return cached
+        
+        decision = self._request_chatgpt_decision(input_data, api_key, model_id)
+        if decision is None:
+            return {"decision": "needs_review", "fallback": True}
+        
+        self._store_cached_decision(cache_key, decision)
+        return decision
+    
+    def _load_cached_decision(self, cache_key: str) -> Optional[Dict]:
+        """Read a previously stored API decision, if any"""
+        cache_path = self.llm_cache_dir / f"{cache_key}.json"
+        try:
+            with open(cache_path, 'r') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+    
+    def _store_cached_decision(self, cache_key: str, decision: Dict) -> None:
+        """Persist an API decision; written to a temp file and renamed so readers never see partial JSON"""
+        cache_path = self.llm_cache_dir / f"{cache_key}.json"
+        tmp_path = cache_path.with_suffix(f'.{os.getpid()}.{threading.get_ident()}.tmp')
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(decision, f)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            print(f"   ⚠️  Could not cache API decision: {e}")
+    
+    def _request_chatgpt_decision(self, input_data: Dict, api_key: str, model_id: str) -> Optional[Dict]:
+        """Request a decision from the API; None if both endpoints fail"""
         try:
             # Use GPT-5 Responses API with deterministic settings
             response = requests.post(
@@ -352,7 +576,7 @@ Temperature: 0. Top_p: 1."""
                     'response_format': {'type': 'json_object'},
                     'input': [
                         {'role': 'system', 'content': self.SYSTEM_PROMPT},
-                        {'role': 'user', 'content': json.dumps(input_data, indent=2)}
+                        {'role': 'user', 'content': json.dumps(input_data, separators=(',', ':'))}
                     ]
                 }
             )
@@ -371,7 +595,7 @@ Temperature: 0. Top_p: 1."""
             # Fallback to Chat Completions API
             return self._fallback_chat_api(input_data, api_key)
     
-    def _fallback_chat_api(self, input_data: Dict, api_key: str) -> Dict:
+    def _fallback_chat_api(self, input_data: Dict, api_key: str) -> Optional[Dict]:
         """Fallback to Chat Completions API if Responses API fails"""
         try:
             response = requests.post(
@@ -388,7 +612,7 @@ Temperature: 0. Top_p: 1."""
                     'response_format': {'type': 'json_object'},
                     'messages': [
                         {'role': 'system', 'content': self.SYSTEM_PROMPT},
-                        {'role': 'user', 'content': json.dumps(input_data, indent=2)}
+                        {'role': 'user', 'content': json.dumps(input_data, separators=(',', ':'))}
                     ]
                 }
             )
@@ -399,11 +623,11 @@ Temperature: 0. Top_p: 1."""
                 return json.loads(content)
             else:
                 print(f"   ⚠️  Fallback API call failed: {response.status_code}")
-                return {"decision": "needs_review"}
+                return None
                 
         except Exception as e:
             print(f"   ⚠️  Fallback API error: {e}")
-            return {"decision": "needs_review"}
+            return None
     
     def step_5_build_master_pdf(self, brief_paths: List[str], trial_record_path: str, 
                                references: List[HyperlinkReference], min_confidence: float = 0.92) -> str:
@@ -415,84 +639,95 @@ Temperature: 0. Top_p: 1."""
         # Create master document
         master_doc = fitz.open()
         
-        # Add Brief documents
+        # Add Brief documents, recording each brief's page offset in the master.
+        # Source links are not copied: the master's navigation links are generated below.
         brief_page_count = 0
+        self._brief_offsets = {}
         for brief_path in brief_paths:
-            brief_doc = fitz.open(brief_path)
-            master_doc.insert_pdf(brief_doc)
+            brief_doc = self._source_doc(brief_path)
+            master_doc.insert_pdf(brief_doc, links=False)
+            self._brief_offsets.setdefault(Path(brief_path).name, brief_page_count)
             brief_page_count += len(brief_doc)
-            brief_doc.close()
         
         # Add Trial Record
-        tr_doc = fitz.open(trial_record_path)
+        tr_doc = self._source_doc(trial_record_path)
         tr_offset = brief_page_count
-        master_doc.insert_pdf(tr_doc)
-        tr_doc.close()
-        
-        # Insert hyperlinks
-        links_added = 0
+        master_doc.insert_pdf(tr_doc, links=False)
+        # Sources are fully copied into the master; this is their last use in the run
+        self._close_source_docs()
+        
+        # Group hyperlinks by source page
+        total_pages = len(master_doc)
+        links_by_page = {}
+        self._broken_links = 0
         for ref in references:
             should_link = (ref.top_confidence >= min_confidence or 
                           ref.llm_decision == 'pick') and ref.rects
             
             if should_link:
-                source_page_global = self._get_global_page_number(ref.source_file, ref.source_page, brief_paths)
+                source_page_global = self._get_global_page_number(ref.source_file, ref.source_page)
                 target_page_global = tr_offset + ref.top_dest_page - 1
                 
-                if 0 <= source_page_global < len(master_doc):
-                    page = master_doc[source_page_global]
-                    
+                if 0 <= source_page_global < total_pages:
+                    if target_page_global >= total_pages:
+                        self._broken_links += len(ref.rects)
+                    page_links = links_by_page.setdefault(source_page_global, [])
                     for rect in ref.rects:
-                        link_rect = fitz.Rect(rect.x0, rect.y0, rect.x1, rect.y1)
-                        page.insert_link({
-                            "from": link_rect,
+                        page_links.append({
+                            "from": fitz.Rect(rect.x0, rect.y0, rect.x1, rect.y1),
                             "kind": fitz.LINK_GOTO,
                             "page": target_page_global,
-                            "to": fitz.Point(0, 0)
+                            "to": _LINK_ORIGIN
                         })
-                        links_added += 1
         
-        # Save master PDF
-        master_doc.save(str(master_path))
+        # Insert hyperlinks, loading each source page once
+        links_added = 0
+        for source_page_global, page_links in links_by_page.items():
+            page = master_doc[source_page_global]
+            for link in page_links:
+                page.insert_link(link)
+            links_added += len(page_links)
+        
+        # Save master PDF compacted, via a temp file swapped in atomically
+        tmp_path = master_path.with_suffix('.pdf.tmp')
+        master_doc.save(str(tmp_path), garbage=4, deflate=True, deflate_images=True, deflate_fonts=True)
         master_doc.close()
+        os.replace(tmp_path, master_path)
         
         print(f"   ✅ Master PDF created with {links_added} links")
         return str(master_path)
     
-    def _get_global_page_number(self, source_file: str, source_page: int, brief_paths: List[str]) -> int:
+    def _get_global_page_number(self, source_file: str, source_page: int) -> int:
         """Calculate global page number in master PDF"""
-        page_offset = 0
-        
-        for brief_path in brief_paths:
-            brief_filename = Path(brief_path).name
-            if source_file == brief_filename:
-                return page_offset + source_page - 1
-            
-            doc = fitz.open(brief_path)
-            page_offset += len(doc)
-            doc.close()
-        
-        return -1
+        page_offset = self._brief_offsets.get(source_file)
+        if page_offset is None:
+            return -1
+        return page_offset + source_page - 1
     
-    def step_6_validate_deterministic(self, master_pdf_path: str, references: List[HyperlinkReference]) -> Dict:
+    def step_6_validate_deterministic(self, master_pdf_path: str, references: List[HyperlinkReference],
+                                      deep_validate: bool = False, counts: Optional[Dict[str, Any]] = None) -> Dict:
         """6) Validation with deterministic hash (non-LLM)"""
         print("✅ Validating with deterministic hash...")
         
         # Count categories
-        auto_linked = sum(1 for r in references if r.top_confidence >= 0.92)
-        reviewed_linked = sum(1 for r in references if r.llm_decision == 'pick')
+        counts = counts or self._count_references(references)
+        auto_linked = counts["high_confidence"]
+        reviewed_linked = counts["reviewed_linked"]
         exceptions = len(references) - auto_linked - reviewed_linked
         
-        # Check broken links
-        doc = fitz.open(master_pdf_path)
-        broken_links = 0
-        for page_num in range(len(doc)):
-            page = doc[page_num]
-            links = page.get_links()
-            for link in links:
-                if link.get("page", -1) >= len(doc):
-                    broken_links += 1
-        doc.close()
+        # Check broken links (recorded during step 5; deep_validate re-walks the written PDF for audits)
+        if deep_validate:
+            doc = fitz.open(master_pdf_path)
+            broken_links = 0
+            for page_num in range(len(doc)):
+                page = doc[page_num]
+                links = page.get_links()
+                for link in links:
+                    if link.get("page", -1) >= len(doc):
+                        broken_links += 1
+            doc.close()
+        else:
+            broken_links = self._broken_links
         
         # Calculate deterministic hash
         hash_data = []
@@ -528,88 +763,127 @@ Temperature: 0. Top_p: 1."""
         print(f"   📊 Validation complete - Hash: {deterministic_hash[:16]}...")
         return report
     
-    def export_candidate_map(self, references: List[HyperlinkReference]) -> Tuple[str, str]:
+    def export_candidate_map(self, references: List[HyperlinkReference],
+                             counts: Optional[Dict[str, Any]] = None,
+                             candidate_rows: Optional[List[List[Any]]] = None) -> Tuple[str, str]:
         """Export candidate map for review"""
         print("📋 Exporting candidate map...")
         
-        # JSON export
-        json_data = {
+        # JSON export, streamed one reference at a time
+        counts = counts or self._count_references(references)
+        summary = {
             "case": "Ferrante",
             "total_references": len(references),
-            "by_type": self._count_by_type(references),
-            "high_confidence": len([r for r in references if r.top_confidence >= 0.92]),
-            "needs_review": len([r for r in references if r.top_confidence < 0.92]),
-            "references": [asdict(ref) for ref in references]
+            "by_type": counts["by_type"],
+            "high_confidence": counts["high_confidence"],
+            "needs_review": counts["needs_review"]
         }
         
         json_path = self.output_dir / "Ferrante_candidate_hyperlink_map.json"
         with open(json_path, 'w') as f:
-            json.dump(json_data, f, indent=2, default=str)
+            f.write('{\n')
+            for key, value in summary.items():
+                f.write(f'  {json.dumps(key)}: {json.dumps(value)},\n')
+            f.write('  "references": [')
+            for i, ref in enumerate(references):
+                f.write(',\n    ' if i else '\n    ')
+                f.write(json.dumps(asdict(ref), default=str))
+            f.write('\n  ]\n}\n' if references else ']\n}\n')
         
         # CSV export
         csv_path = self.output_dir / "Ferrante_candidate_hyperlink_map.csv"
         with open(csv_path, 'w', newline='') as f:
             writer = csv.writer(f)
-            writer.writerow([
-                'source_file', 'source_page', 'ref_type', 'ref_value', 'snippet',
-                'rects_count', 'top_dest_page', 'top_confidence', 'top_method',
-                'llm_decision', 'deterministic_hash'
-            ])
-            
-            for ref in references:
-                writer.writerow([
-                    ref.source_file, ref.source_page, ref.ref_type, ref.ref_value,
-                    f'"{ref.snippet}"', len(ref.rects),
-                    ref.top_dest_page, ref.top_confidence, ref.top_method,
-                    ref.llm_decision or 'auto'
-                ])
+            writer.writerow(self.CANDIDATE_CSV_HEADER)
+            writer.writerows(candidate_rows if candidate_rows is not None else self.candidate_csv_rows(references))
         
         print(f"   ✅ Exported: {json_path.name}, {csv_path.name}")
         return str(json_path), str(csv_path)
     
-    def _count_by_type(self, references: List[HyperlinkReference]) -> Dict[str, int]:
-        """Count references by type"""
-        counts = {}
+    @staticmethod
+    def candidate_csv_rows(references: List[HyperlinkReference]) -> List[List[Any]]:
+        """Candidate map CSV rows (without header), one per reference"""
+        return [
+            [
+                ref.source_file, ref.source_page, ref.ref_type, ref.ref_value,
+                f'"{ref.snippet}"', len(ref.rects),
+                ref.top_dest_page, ref.top_confidence, ref.top_method,
+                ref.llm_decision or 'auto'
+            ]
+            for ref in references
+        ]
+    
+    def _count_references(self, references: List[HyperlinkReference]) -> Dict[str, Any]:
+        """Type and confidence-bucket counts in a single pass over the references"""
+        by_type = Counter()
+        high_confidence = 0
+        reviewed_linked = 0
         for ref in references:
-            counts[ref.ref_type] = counts.get(ref.ref_type, 0) + 1
-        return counts
+            by_type[ref.ref_type] += 1
+            if ref.top_confidence >= 0.92:
+                high_confidence += 1
+            if ref.llm_decision == 'pick':
+                reviewed_linked += 1
+        
+        return {
+            "by_type": dict(by_type),
+            "high_confidence": high_confidence,
+            "needs_review": len(references) - high_confidence,
+            "reviewed_linked": reviewed_linked
+        }
     
     def process_deterministic_pipeline(self, brief_paths: List[str], trial_record_path: str,
-                                     min_confidence: float = 0.92) -> Dict[str, Any]:
+                                     min_confidence: float = 0.92,
+                                     output_dir: Optional[str] = None,
+                                     include_candidates: bool = False) -> Dict[str, Any]:
         """Execute complete deterministic pipeline"""
         print("🚀 Starting Deterministic Hyperlinking Pipeline...")
         
-        # Step 1: Extract deterministically
-        all_references = []
-        for brief_path in brief_paths:
-            filename = Path(brief_path).name
-            refs = self.step_1_extract_deterministic(brief_path, filename)
-            all_references.extend(refs)
+        # Per-run output dir lets one detector instance serve many runs
+        if output_dir is not None:
+            self.output_dir = Path(output_dir)
+            self.output_dir.mkdir(parents=True, exist_ok=True)
         
-        # Step 2: Build TR index
-        self.step_2_build_tr_index(trial_record_path)
+        try:
+            # Step 1: Extract deterministically
+            all_references = []
+            for brief_path in brief_paths:
+                filename = Path(brief_path).name
+                refs = self.step_1_extract_deterministic(brief_path, filename)
+                all_references.extend(refs)
+        
+            # Step 2: Build TR index
+            self.step_2_build_tr_index(trial_record_path)
         
-        # Step 3: Score deterministically
-        all_references = self.step_3_score_deterministic(all_references)
+            # Step 3: Score deterministically
+            all_references = self.step_3_score_deterministic(all_references)
         
-        # Step 4: LLM resolve ambiguities
-        all_references = self.step_4_llm_resolve(all_references, min_confidence)
+            # Step 4: LLM resolve ambiguities
+            all_references = self.step_4_llm_resolve(all_references, min_confidence)
         
-        # Step 5: Export candidate map
-        json_path, csv_path = self.export_candidate_map(all_references)
+            # Counts are final once ambiguities are resolved
+            counts = self._count_references(all_references)
         
-        # Step 6: Build master PDF
-        master_pdf_path = self.step_5_build_master_pdf(brief_paths, trial_record_path, all_references, min_confidence)
+            # Step 5: Export candidate map
+            candidate_rows = self.candidate_csv_rows(all_references)
+            json_path, csv_path = self.export_candidate_map(all_references, counts, candidate_rows)
         
-        # Step 7: Validate with hash
-        validation_report = self.step_6_validate_deterministic(master_pdf_path, all_references)
+            # Step 6: Build master PDF
+            master_pdf_path = self.step_5_build_master_pdf(brief_paths, trial_record_path, all_references, min_confidence)
+        
+            # Step 7: Validate with hash
+            validation_report = self.step_6_validate_deterministic(master_pdf_path, all_references, counts=counts)
+        finally:
+            # Steps share open source PDFs; release them even when a step fails
+            self._close_source_docs()
         
         results = {
             "status": "success",
             "total_references": len(all_references),
-            "by_type": self._count_by_type(all_references),
-            "high_confidence": len([r for r in all_references if r.top_confidence >= 0.92]),
-            "needs_review": len([r for r in all_references if r.top_confidence < 0.92]),
+            "by_type": counts["by_type"],
+            "high_confidence": counts["high_confidence"],
+            "needs_review": counts["needs_review"],
+            "llm_fallbacks": self.llm_fallbacks,
             "validation_report": validation_report,
             "outputs": {
                 "master_pdf": master_pdf_path,
@@ -617,10 +891,32 @@ Temperature: 0. Top_p: 1."""
                 "candidate_map_csv": csv_path
             }
         }
+        if include_candidates:
+            # In-memory CSV rows so callers can stream the map without rereading the file
+            results["candidates"] = candidate_rows
         
         print("\n🎉 Deterministic Pipeline Complete!")
         print(f"   📊 Total References: {results['total_references']}")
         print(f"   ✅ High Confidence: {results['high_confidence']}")
         print(f"   🔄 Hash: {validation_report['deterministic_hash'][:16]}...")
         
-        return results
\ No newline at end of file
+        return results
+
+
+# Per-worker open documents for parallel page extraction
+_worker_docs: Dict[str, fitz.Document] = {}
+
+def _worker_doc(pdf_path: str) -> fitz.Document:
+    """Open a document once per worker process"""
+    doc = _worker_docs.get(pdf_path)
+    if doc is None:
+        doc = _worker_docs[pdf_path] = fitz.open(pdf_path)
+    return doc
+
+def _extract_page_refs(pdf_path: str, page_num: int, filename: str) -> List[HyperlinkReference]:
+    """Process-pool worker: extract references from one brief page"""
+    return DeterministicHyperlinkDetector._extract_page_references(_worker_doc(pdf_path)[page_num], page_num, filename)
+
+def _index_tr_page(trial_record_path: str, page_num: int) -> str:
+    """Process-pool worker: normalized text of one trial record page"""
+    return DeterministicHyperlinkDetector._normalized_page_text(_worker_doc(trial_record_path)[page_num])
@@ -3,17 +3,379 @@ FastAPI endpoint for Ferrante case processing
 Provides REST API for the hyperlink detection system
 """
 
-from fastapi import FastAPI, File, UploadFile, Form, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import Depends, FastAPI, File, UploadFile, Form, HTTPException, Request
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+try:
+    import orjson  # Optional: faster serializer when installed
+except ImportError:
+    orjson = None
+import asyncio
+import csv
+import io
+import functools
+import hashlib
+import json
+import multiprocessing
+import secrets
 import tempfile
+import threading
+import types
 import os
-from pathlib import Path
-from typing import List
+from contextlib import asynccontextmanager
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from email.utils import formatdate, parsedate_to_datetime
+from itertools import chain
+from pathlib import Path, PurePath
+from typing import Any, Dict, List, Optional, Tuple
 import shutil
 
 from deterministic_hyperlink_detector import DeterministicHyperlinkDetector
 
-app = FastAPI(title="Ferrante Hyperlink Processor", version="1.0.0")
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson when available, stdlib json otherwise"""
+    
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content)
+        return super().render(content)
+
+# Already-deflated PDFs gain almost nothing from gzip; their routes are served as stored
+UNCOMPRESSED_PATHS = frozenset({"/download/master_pdf"})
+
+class SelectiveGZipMiddleware:
+    """GZipMiddleware for compressible routes only; compressed bodies get a weak ETag"""
+    
+    def __init__(self, app: ASGIApp, **gzip_options: Any):
+        self.app = app
+        self.gzip = GZipMiddleware(app, **gzip_options)
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        # Range requests stay identity-encoded: partial content must match the stored file's bytes
+        if scope["type"] != "http" or scope["path"] in UNCOMPRESSED_PATHS or Headers(scope=scope).get("range"):
+            await self.app(scope, receive, send)
+            return
+        await self.gzip(scope, receive, _weak_etag_send(send))
+
+def _weak_etag_send(send: Send) -> Send:
+    """Wrap send so a gzip-encoded response never carries the identity body's strong ETag"""
+    async def wrapped(message: Message):
+        if message["type"] == "http.response.start":
+            headers = MutableHeaders(raw=message["headers"])
+            etag = headers.get("etag")
+            if headers.get("content-encoding") == "gzip" and etag and not etag.startswith("W/"):
+                headers["etag"] = f"W/{etag}"
+        await send(message)
+    return wrapped
+
+# Persistent locations, created once at startup
+INSTANT_DIR = Path("workspace/exports/instant_api")
+FERRANTE_DIR = Path("workspace/exports/ferrante_api")
+CACHE_DIR = Path("workspace/cache")
+RESULT_CACHE_DIR = CACHE_DIR / "results"
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create persistent directories once instead of on every request"""
+    global _pipeline_queue
+    for directory in (INSTANT_DIR, FERRANTE_DIR, RESULT_CACHE_DIR):
+        directory.mkdir(parents=True, exist_ok=True)
+    _pipeline_queue = asyncio.Queue()
+    workers = [asyncio.create_task(_pipeline_worker()) for _ in range(PIPELINE_WORKERS)]
+    yield
+    for worker in workers:
+        worker.cancel()
+    PIPELINE_EXECUTOR.shutdown(wait=False, cancel_futures=True)
+
+app = FastAPI(title="Ferrante Hyperlink Processor", version="1.0.0", default_response_class=FastJSONResponse,
+              lifespan=lifespan)
+# JSON responses and candidate map downloads compress well; tiny bodies are not worth it
+app.add_middleware(SelectiveGZipMiddleware, minimum_size=1024, compresslevel=5)
+
+# Number of concurrent detector runs (queue workers and pipeline processes)
+PIPELINE_WORKERS = int(os.environ.get('FERRANTE_WORKERS', '4'))
+
+# Detectors are stateful per run, so each pipeline process keeps its own long-lived instance
+DETECTOR_OUTPUT_DIR = "workspace/exports/ferrante"
+LLM_CACHE_DIR = str(CACHE_DIR / "llm")
+_detector: Optional[DeterministicHyperlinkDetector] = None
+
+def _init_pipeline_worker():
+    """Create the detector for this pipeline process once, at process startup"""
+    global _detector
+    # Runs already execute PIPELINE_WORKERS processes side by side; page-level pools would multiply them
+    _detector = DeterministicHyperlinkDetector(DETECTOR_OUTPUT_DIR, llm_cache_dir=LLM_CACHE_DIR, page_workers=1)
+
+def _run_detector(**kwargs) -> Dict[str, Any]:
+    """Run the pipeline on this process's reusable detector"""
+    return _detector.process_deterministic_pipeline(**kwargs)
+
+# The detector is CPU-bound; separate processes let concurrent runs escape the GIL.
+# forkserver avoids forking the server's threads and event loop into workers.
+_mp_start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else None
+PIPELINE_EXECUTOR = ProcessPoolExecutor(
+    max_workers=PIPELINE_WORKERS,
+    mp_context=multiprocessing.get_context(_mp_start_method),
+    initializer=_init_pipeline_worker
+)
+
+# Candidate rows from the most recent /process run in this server process, tagged with the
+# identity of the CSV it published; other uvicorn workers may publish a newer one since
+_latest_candidates: Optional[Tuple[Tuple[int, int], List[List[Any]]]] = None
+
+def _file_identity(path: Path) -> Optional[Tuple[int, int]]:
+    """(inode, mtime_ns) of a published output, or None if it does not exist"""
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns
+
+# Expected Ferrante reference counts for /process validation
+EXPECTED_COUNTS = types.MappingProxyType({
+    'exhibit': 108,
+    'refusal': 21,
+    'under_advisement': 11,
+    'affidavit': 1
+})
+EXPECTED_COUNT_ITEMS = tuple(EXPECTED_COUNTS.items())
+
+# Static parts of the /process response, built once and shared (never mutated)
+PROCESS_DOWNLOADS = {
+    "master_pdf": "/download/master_pdf",
+    "candidate_map_json": "/download/candidate_map_json",
+    "candidate_map_csv": "/download/candidate_map_csv"
+}
+PROCESS_DETERMINISTIC_FEATURES = {
+    "chatgpt_api": "Same API as your app for consistency",
+    "confidence_scoring": "1.0 (exact), 0.85-0.90 (token), 0.80 (section)",
+    "tie_breaking": "score > lowest_page > method_order",
+    "reproducibility": "100% - identical inputs = identical outputs"
+}
+
+def accuracy_rate(result: Dict[str, Any]) -> str:
+    """High-confidence share of all references, formatted as a percentage"""
+    total = result['total_references']
+    return f"{result['high_confidence']/total*100:.1f}%" if total > 0 else "0%"
+
+class DownloadFileResponse(FileResponse):
+    """FileResponse streaming in 1MB chunks; Range requests are served as 206 partial content"""
+    chunk_size = 1024 * 1024
+
+# Large buffer for persisting uploads: fewer syscalls than copyfileobj's default
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Upload size cap (per request and per file) and the header every PDF starts with
+MAX_UPLOAD_BYTES = int(os.environ.get('FERRANTE_MAX_BYTES', str(500 * 1024 * 1024)))
+PDF_MAGIC = b"%PDF-"
+
+def _default_tmp_root() -> Optional[str]:
+    """Use RAM-backed /dev/shm for scratch files when it can hold a full upload and its outputs"""
+    shm = "/dev/shm"
+    if os.path.isdir(shm) and os.access(shm, os.W_OK) and shutil.disk_usage(shm).free >= 2 * MAX_UPLOAD_BYTES:
+        return shm
+    return None
+
+# Scratch space for uploads and pipeline outputs (None = system default temp dir)
+TMP_ROOT = os.environ.get('FERRANTE_TMP_ROOT') or _default_tmp_root()
+
+async def _validate_pdf_upload(upload: UploadFile, field: str):
+    """Check an upload's name, extension and %PDF- header without writing anything to disk"""
+    if not upload.filename or PurePath(upload.filename).suffix.lower() != ".pdf":
+        raise HTTPException(status_code=415, detail=f"{field} file {upload.filename or 'unknown'} must be a PDF")
+    header = await upload.read(len(PDF_MAGIC))
+    await upload.seek(0)
+    if header != PDF_MAGIC:
+        raise HTTPException(status_code=415, detail=f"{field} file {upload.filename} is not a valid PDF")
+
+async def validate_pdf_uploads(*uploads: Tuple[UploadFile, str]):
+    """Validate every upload before any of them is saved"""
+    await asyncio.gather(*[_validate_pdf_upload(upload, field) for upload, field in uploads])
+
+# Upload routes whose declared request size is checked before FastAPI parses (and spools) the body
+UPLOAD_PATHS = frozenset({"/instant", "/process"})
+
+class UploadSizeLimitMiddleware:
+    """Answer 413 from the Content-Length header before any upload bytes are received"""
+    
+    def __init__(self, app: ASGIApp):
+        self.app = app
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] == "http" and scope["path"] in UPLOAD_PATHS:
+            content_length = Headers(scope=scope).get("content-length")
+            if content_length and content_length.isdigit() and int(content_length) > MAX_UPLOAD_BYTES:
+                response = FastJSONResponse({"detail": f"Upload exceeds {MAX_UPLOAD_BYTES} bytes"}, status_code=413)
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+app.add_middleware(UploadSizeLimitMiddleware)
+
+def _write_and_hash(f, digest, chunk: bytes):
+    """Write a chunk and fold it into the content digest (hashlib releases the GIL for large buffers)"""
+    f.write(chunk)
+    digest.update(chunk)
+
+async def validated_instant_uploads(
+    trial_record: UploadFile = File(..., description="Trial record file"),
+    brief_files: List[UploadFile] = File(default=[], description="Brief files")
+) -> Tuple[UploadFile, List[UploadFile]]:
+    """Dependency: reject non-PDF /instant uploads before the handler runs"""
+    await validate_pdf_uploads((trial_record, "Trial record"), *[(file, "Brief") for file in brief_files])
+    return trial_record, brief_files
+
+async def validated_process_uploads(
+    brief1: UploadFile = File(..., description="Amended Doc Brief - Ferrante - 3 July 2025.pdf"),
+    brief2: UploadFile = File(..., description="Amended Supp Doc Brief - Ferrante - 3 July 2025 (2).pdf"),
+    trial_record: UploadFile = File(..., description="Trial Record - Ferrante - August 13 2025.pdf")
+) -> Tuple[UploadFile, UploadFile, UploadFile]:
+    """Dependency: reject non-PDF /process uploads before the handler runs"""
+    await validate_pdf_uploads((brief1, "Brief 1"), (brief2, "Brief 2"), (trial_record, "Trial record"))
+    return brief1, brief2, trial_record
+
+async def save_validated_pdf(upload: UploadFile, path: Path, max_bytes: int = MAX_UPLOAD_BYTES) -> str:
+    """Stream a validated upload to disk in large chunks, enforcing the size cap; returns its SHA-256"""
+    # SHA-256 is hardware-accelerated (SHA-NI / ARMv8 via OpenSSL) and outpaces BLAKE2b there
+    digest = hashlib.sha256()
+    written = 0
+    with open(path, "wb") as f:
+        while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+            written += len(chunk)
+            if written > max_bytes:
+                raise HTTPException(status_code=413, detail=f"File {upload.filename or 'unknown'} exceeds {max_bytes} bytes")
+            await asyncio.to_thread(_write_and_hash, f, digest, chunk)
+    return digest.hexdigest()
+
+async def save_uploads(*saves) -> List[str]:
+    """Run upload saves concurrently, letting all finish before surfacing the first error"""
+    results = await asyncio.gather(*saves, return_exceptions=True)
+    for outcome in results:
+        if isinstance(outcome, BaseException):
+            raise outcome
+    return results
+
+def publish_output(src: str, dst: Path):
+    """Promote a pipeline output to persistent storage: hardlink when possible, kernel copy otherwise"""
+    staging = dst.with_name(f".{dst.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    # A stale staging file from an interrupted publish would make os.link fail
+    staging.unlink(missing_ok=True)
+    try:
+        os.link(src, staging)
+    except OSError:
+        # Cross-device (e.g. tmpfs -> disk): copyfile uses sendfile on Linux
+        shutil.copyfile(src, staging)
+    os.replace(staging, dst)
+    # rename() is a no-op when dst is already a link to the same file, leaving staging behind
+    staging.unlink(missing_ok=True)
+
+# Pipeline results keyed by input content, so resubmitted documents skip reprocessing
+RESULT_CACHE_MAX_ENTRIES = int(os.environ.get('FERRANTE_RESULT_CACHE_ENTRIES', '32'))
+CACHED_OUTPUTS = ("master_pdf", "candidate_map_json", "candidate_map_csv")
+
+def result_cache_key(trial_record_digest: str, brief_digests: List[str], brief_paths: List[str],
+                     min_confidence: float) -> str:
+    """Cache key over everything the pipeline output depends on (brief order matters)"""
+    # Brief file names end up in the outputs as source_file, and differ between endpoints
+    brief_names = [PurePath(brief_path).name for brief_path in brief_paths]
+    key_input = json.dumps([trial_record_digest, brief_digests, brief_names, min_confidence], separators=(",", ":"))
+    return hashlib.sha256(key_input.encode()).hexdigest()
+
+def load_cached_result(cache_key: str) -> Optional[Dict[str, Any]]:
+    """Return a cached pipeline result and mark it recently used, or None"""
+    result_path = RESULT_CACHE_DIR / cache_key / "result.json"
+    try:
+        with open(result_path, "r", encoding="utf-8") as f:
+            result = json.load(f)
+    except (OSError, ValueError):
+        return None
+    os.utime(result_path.parent)
+    return result
+
+def store_cached_result(cache_key: str, result: Dict[str, Any]) -> Dict[str, Any]:
+    """Move pipeline outputs into the result cache; returns the result pointing at cached files"""
+    if result.get('llm_fallbacks'):
+        # An LLM outage must not be frozen into the cache: store under a name no lookup uses,
+        # so the outputs outlive the run (for coalesced requests) but a resubmission retries
+        cache_key = f"{cache_key}-{secrets.token_hex(8)}"
+    entry_dir = RESULT_CACHE_DIR / cache_key
+    staging_dir = Path(tempfile.mkdtemp(prefix=f".{cache_key}.", dir=RESULT_CACHE_DIR))
+    cached = dict(result)
+    cached['outputs'] = {}
+    for name in CACHED_OUTPUTS:
+        src = Path(result['outputs'][name])
+        publish_output(str(src), staging_dir / src.name)
+        cached['outputs'][name] = str(entry_dir / src.name)
+    with open(staging_dir / "result.json", "w", encoding="utf-8") as f:
+        json.dump(cached, f, separators=(",", ":"))
+    try:
+        os.rename(staging_dir, entry_dir)
+    except OSError:
+        # A concurrent request already cached identical inputs
+        shutil.rmtree(staging_dir, ignore_errors=True)
+    prune_result_cache()
+    return cached
+
+def prune_result_cache():
+    """Evict least recently used cache entries beyond RESULT_CACHE_MAX_ENTRIES"""
+    entries = [entry for entry in RESULT_CACHE_DIR.iterdir() if entry.is_dir() and not entry.name.startswith(".")]
+    if len(entries) <= RESULT_CACHE_MAX_ENTRIES:
+        return
+    entries.sort(key=lambda entry: entry.stat().st_mtime)
+    for entry in entries[:len(entries) - RESULT_CACHE_MAX_ENTRIES]:
+        shutil.rmtree(entry, ignore_errors=True)
+
+@dataclass(slots=True)
+class PipelineJob:
+    """A queued detector run; every request waiting on the same inputs shares its future"""
+    cache_key: str
+    kwargs: Dict[str, Any]
+    future: asyncio.Future
+
+# Jobs are produced by the endpoints and consumed by PIPELINE_WORKERS tasks started at startup
+_pipeline_queue: Optional[asyncio.Queue] = None
+_inflight_jobs: Dict[str, PipelineJob] = {}
+
+async def _pipeline_worker():
+    """Consume queued jobs: run the pipeline and cache its result"""
+    while True:
+        job = await _pipeline_queue.get()
+        try:
+            result = await run_pipeline(**job.kwargs)
+            job.future.set_result(await asyncio.to_thread(store_cached_result, job.cache_key, result))
+        except Exception as e:
+            job.future.set_exception(e)
+        finally:
+            _inflight_jobs.pop(job.cache_key, None)
+            _pipeline_queue.task_done()
+
+async def run_cached_pipeline(cache_key: str, **kwargs) -> Dict[str, Any]:
+    """Return the cached result for cache_key, queueing a pipeline run on a miss"""
+    result = await asyncio.to_thread(load_cached_result, cache_key)
+    if result is not None:
+        print(f"♻️ Result cache hit: {cache_key[:16]}...")
+        result['cache'] = "hit"
+        return result
+    
+    # Coalesce identical in-flight requests onto a single run
+    job = _inflight_jobs.get(cache_key)
+    if job is None:
+        job = _inflight_jobs[cache_key] = PipelineJob(cache_key, kwargs, asyncio.get_running_loop().create_future())
+        await _pipeline_queue.put(job)
+    else:
+        print(f"🔗 Joined in-flight run: {cache_key[:16]}...")
+    # Shield so one disconnecting client cannot cancel the run for the others
+    result = dict(await asyncio.shield(job.future))
+    result['cache'] = "miss"
+    return result
+
+async def run_pipeline(**kwargs) -> Dict[str, Any]:
+    """Run the deterministic pipeline off the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(PIPELINE_EXECUTOR, functools.partial(_run_detector, **kwargs))
 
 @app.get("/")
 async def root():
@@ -22,6 +384,7 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "process": "POST /process - Upload PDFs and get processed results",
+            "stream_candidates": "GET /stream/candidates.csv - Stream the latest candidate map as CSV",
             "health": "GET /health - Health check"
         }
     }
@@ -32,8 +395,7 @@ async def health_check():
 
 @app.post("/instant")
 async def instant_processing(
-    brief_files: List[UploadFile] = File(default=[], description="Brief files"),
-    trial_record: UploadFile = File(..., description="Trial record file"),
+    uploads: Tuple[UploadFile, List[UploadFile]] = Depends(validated_instant_uploads),
     min_confidence: float = Form(0.92, description="Minimum confidence for auto-linking"),
     use_gpt5: bool = Form(True, description="Use GPT-5 for processing"),
     model: str = Form("gpt-5", description="Model to use"),
@@ -44,33 +406,18 @@ async def instant_processing(
     Instant processing endpoint compatible with Express routes
     """
     
-    # Validate required files
-    if not trial_record:
-        raise HTTPException(status_code=400, detail="Trial record file is required")
-    
-    if not trial_record.filename or not trial_record.filename.endswith('.pdf'):
-        raise HTTPException(status_code=400, detail="Trial record must be a PDF")
-    
-    # Validate brief files
-    for file in brief_files:
-        if not file.filename or not file.filename.endswith('.pdf'):
-            raise HTTPException(status_code=400, detail=f"File {file.filename or 'unknown'} must be a PDF")
+    trial_record, brief_files = uploads
     
-    with tempfile.TemporaryDirectory() as temp_dir:
+    with tempfile.TemporaryDirectory(dir=TMP_ROOT) as temp_dir:
         temp_path = Path(temp_dir)
         
-        # Save trial record
+        # Save trial record and brief files concurrently
         trial_record_path = temp_path / "trial_record.pdf"
-        with open(trial_record_path, "wb") as f:
-            shutil.copyfileobj(trial_record.file, f)
-        
-        # Save brief files
-        brief_paths = []
-        for i, brief_file in enumerate(brief_files):
-            brief_path = temp_path / f"brief_{i+1}.pdf"
-            with open(brief_path, "wb") as f:
-                shutil.copyfileobj(brief_file.file, f)
-            brief_paths.append(str(brief_path))
+        brief_paths = [str(temp_path / f"brief_{i+1}.pdf") for i in range(len(brief_files))]
+        trial_record_digest, *brief_digests = await save_uploads(
+            save_validated_pdf(trial_record, trial_record_path),
+            *[save_validated_pdf(brief_file, Path(brief_path)) for brief_file, brief_path in zip(brief_files, brief_paths)]
+        )
         
         # Create output directory
         output_dir = temp_path / "output"
@@ -78,31 +425,31 @@ async def instant_processing(
         
         try:
             # Process the documents using deterministic pipeline
-            detector = DeterministicHyperlinkDetector(str(output_dir))
-            result = detector.process_deterministic_pipeline(
+            result = await run_cached_pipeline(
+                result_cache_key(trial_record_digest, brief_digests, brief_paths, min_confidence),
                 brief_paths=brief_paths,
                 trial_record_path=str(trial_record_path),
-                min_confidence=min_confidence
+                min_confidence=min_confidence,
+                output_dir=str(output_dir)
             )
             
             # Copy results to persistent storage
-            persistent_dir = Path("workspace/exports/instant_api")
-            persistent_dir.mkdir(parents=True, exist_ok=True)
-            
-            master_pdf_persistent = persistent_dir / "Instant_Master.linked.pdf"
-            candidate_json_persistent = persistent_dir / "Instant_candidate_hyperlink_map.json"
-            candidate_csv_persistent = persistent_dir / "Instant_candidate_hyperlink_map.csv"
+            master_pdf_persistent = INSTANT_DIR / "Instant_Master.linked.pdf"
+            candidate_json_persistent = INSTANT_DIR / "Instant_candidate_hyperlink_map.json"
+            candidate_csv_persistent = INSTANT_DIR / "Instant_candidate_hyperlink_map.csv"
             
-            shutil.copy(result['outputs']['master_pdf'], master_pdf_persistent)
-            shutil.copy(result['outputs']['candidate_map_json'], candidate_json_persistent)
-            shutil.copy(result['outputs']['candidate_map_csv'], candidate_csv_persistent)
+            publish_output(result['outputs']['master_pdf'], master_pdf_persistent)
+            publish_output(result['outputs']['candidate_map_json'], candidate_json_persistent)
+            publish_output(result['outputs']['candidate_map_csv'], candidate_csv_persistent)
             
-            return {
+            # Results are JSON-native already; returning a Response skips jsonable_encoder
+            return FastJSONResponse({
                 "status": "success",
+                "cache": result['cache'],
                 "total_references": result['total_references'],
                 "high_confidence": result['high_confidence'],
                 "needs_review": result['needs_review'],
-                "accuracy_rate": f"{result['high_confidence']/result['total_references']*100:.1f}%" if result['total_references'] > 0 else "0%",
+                "accuracy_rate": accuracy_rate(result),
                 "by_type": result['by_type'],
                 "validation_report": result['validation_report'],
                 "processing_params": {
@@ -117,28 +464,23 @@ async def instant_processing(
                     "candidate_map_json_path": str(candidate_json_persistent),
                     "candidate_map_csv_path": str(candidate_csv_persistent)
                 }
-            }
+            })
             
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Processing failed: {str(e)}")
 
 @app.post("/process")
 async def process_ferrante_documents(
-    brief1: UploadFile = File(..., description="Amended Doc Brief - Ferrante - 3 July 2025.pdf"),
-    brief2: UploadFile = File(..., description="Amended Supp Doc Brief - Ferrante - 3 July 2025 (2).pdf"),
-    trial_record: UploadFile = File(..., description="Trial Record - Ferrante - August 13 2025.pdf"),
+    uploads: Tuple[UploadFile, UploadFile, UploadFile] = Depends(validated_process_uploads),
     min_confidence: float = Form(0.5, description="Minimum confidence for auto-linking")
 ):
     """
     Process Ferrante case documents and generate master PDF with hyperlinks
     """
     
-    # Validate file types
-    for file in [brief1, brief2, trial_record]:
-        if not file.filename or not file.filename.endswith('.pdf'):
-            raise HTTPException(status_code=400, detail=f"File {file.filename or 'unknown'} must be a PDF")
+    brief1, brief2, trial_record = uploads
     
-    with tempfile.TemporaryDirectory() as temp_dir:
+    with tempfile.TemporaryDirectory(dir=TMP_ROOT) as temp_dir:
         temp_path = Path(temp_dir)
         
         # Save uploaded files
@@ -146,14 +488,11 @@ async def process_ferrante_documents(
         brief2_path = temp_path / "brief2.pdf"
         trial_record_path = temp_path / "trial_record.pdf"
         
-        with open(brief1_path, "wb") as f:
-            shutil.copyfileobj(brief1.file, f)
-        
-        with open(brief2_path, "wb") as f:
-            shutil.copyfileobj(brief2.file, f)
-        
-        with open(trial_record_path, "wb") as f:
-            shutil.copyfileobj(trial_record.file, f)
+        brief1_digest, brief2_digest, trial_record_digest = await save_uploads(
+            save_validated_pdf(brief1, brief1_path),
+            save_validated_pdf(brief2, brief2_path),
+            save_validated_pdf(trial_record, trial_record_path)
+        )
         
         # Create output directory
         output_dir = temp_path / "output"
@@ -161,110 +500,155 @@ async def process_ferrante_documents(
         
         try:
             # Process the documents using deterministic pipeline
-            detector = DeterministicHyperlinkDetector(str(output_dir))
-            result = detector.process_deterministic_pipeline(
+            result = await run_cached_pipeline(
+                result_cache_key(trial_record_digest, [brief1_digest, brief2_digest], [brief1_path, brief2_path],
+                                 min_confidence),
                 brief_paths=[str(brief1_path), str(brief2_path)],
                 trial_record_path=str(trial_record_path),
-                min_confidence=min_confidence
+                min_confidence=min_confidence,
+                output_dir=str(output_dir),
+                include_candidates=True
             )
             
             # Copy results to persistent storage
-            persistent_dir = Path("workspace/exports/ferrante_api")
-            persistent_dir.mkdir(parents=True, exist_ok=True)
+            master_pdf_persistent = FERRANTE_DIR / "Ferrante_Master.linked.pdf"
+            candidate_json_persistent = FERRANTE_DIR / "Ferrante_candidate_hyperlink_map.json"
+            candidate_csv_persistent = FERRANTE_DIR / "Ferrante_candidate_hyperlink_map.csv"
             
-            master_pdf_persistent = persistent_dir / "Ferrante_Master.linked.pdf"
-            candidate_json_persistent = persistent_dir / "Ferrante_candidate_hyperlink_map.json"
-            candidate_csv_persistent = persistent_dir / "Ferrante_candidate_hyperlink_map.csv"
+            publish_output(result['outputs']['master_pdf'], master_pdf_persistent)
+            publish_output(result['outputs']['candidate_map_json'], candidate_json_persistent)
+            publish_output(result['outputs']['candidate_map_csv'], candidate_csv_persistent)
             
-            shutil.copy(result['outputs']['master_pdf'], master_pdf_persistent)
-            shutil.copy(result['outputs']['candidate_map_json'], candidate_json_persistent)
-            shutil.copy(result['outputs']['candidate_map_csv'], candidate_csv_persistent)
-            
-            # Expected counts for validation
-            expected_counts = {
-                'exhibit': 108,
-                'refusal': 21,
-                'under_advisement': 11,
-                'affidavit': 1
-            }
+            # Keep the candidate rows for /stream/candidates.csv while this CSV is the published one
+            global _latest_candidates
+            _latest_candidates = (_file_identity(candidate_csv_persistent), result['candidates'])
             
             # Calculate accuracy
-            accuracy_analysis = {}
-            for ref_type, expected in expected_counts.items():
-                found = result['by_type'].get(ref_type, 0)
-                accuracy_analysis[ref_type] = {
+            by_type = result['by_type']
+            accuracy_analysis = {
+                ref_type: {
                     "expected": expected,
-                    "found": found,
+                    "found": (found := by_type.get(ref_type, 0)),
                     "accuracy": "perfect" if found == expected else "deviation"
                 }
+                for ref_type, expected in EXPECTED_COUNT_ITEMS
+            }
             
-            return {
+            # Results are JSON-native already; returning a Response skips jsonable_encoder
+            return FastJSONResponse({
                 "status": "success",
+                "cache": result['cache'],
                 "total_references": result['total_references'],
                 "high_confidence": result['high_confidence'],
                 "needs_review": result['needs_review'],
-                "accuracy_rate": f"{result['high_confidence']/result['total_references']*100:.1f}%" if result['total_references'] > 0 else "0%",
+                "accuracy_rate": accuracy_rate(result),
                 "by_type": result['by_type'],
                 "accuracy_analysis": accuracy_analysis,
                 "validation_report": result['validation_report'],
-                "downloads": {
-                    "master_pdf": "/download/master_pdf",
-                    "candidate_map_json": "/download/candidate_map_json", 
-                    "candidate_map_csv": "/download/candidate_map_csv"
-                },
+                "downloads": PROCESS_DOWNLOADS,
                 "deterministic_features": {
-                    "chatgpt_api": "Same API as your app for consistency",
-                    "confidence_scoring": "1.0 (exact), 0.85-0.90 (token), 0.80 (section)",
-                    "tie_breaking": "score > lowest_page > method_order",
-                    "validation_hash": result['validation_report']['deterministic_hash'][:16] + "...",
-                    "reproducibility": "100% - identical inputs = identical outputs"
+                    **PROCESS_DETERMINISTIC_FEATURES,
+                    "validation_hash": result['validation_report']['deterministic_hash'][:16] + "..."
                 }
-            }
+            })
             
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Processing failed: {str(e)}")
 
-@app.get("/download/master_pdf")
-async def download_master_pdf():
-    """Download the generated master PDF"""
-    file_path = Path("workspace/exports/ferrante_api/Ferrante_Master.linked.pdf")
-    if not file_path.exists():
-        raise HTTPException(status_code=404, detail="Master PDF not found. Process documents first.")
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against our ETag"""
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+def download_file(request: Request, file_path: Path, media_type: str, missing_detail: str) -> Response:
+    """Serve a published output with validators; unchanged files get an empty 304"""
+    try:
+        stat_result = file_path.stat()
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=missing_detail)
+    
+    etag = f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(stat_result.st_mtime, usegmt=True),
+        # Outputs are replaced by every /process run: always revalidate, which is cheap with a 304
+        "Cache-Control": "private, no-cache"
+    }
+    if_none_match = request.headers.get("if-none-match")
+    if_modified_since = request.headers.get("if-modified-since")
+    not_modified = False
+    if if_none_match is not None:
+        not_modified = _etag_matches(if_none_match, etag)
+    elif if_modified_since:
+        try:
+            not_modified = int(stat_result.st_mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            pass  # Malformed date: ignore the condition
+    if not_modified:
+        return Response(status_code=304, headers=headers)
     
-    return FileResponse(
+    return DownloadFileResponse(
         path=str(file_path),
-        filename="Ferrante_Master.linked.pdf",
-        media_type="application/pdf"
+        filename=file_path.name,
+        media_type=media_type,
+        headers=headers,
+        stat_result=stat_result
     )
 
+@app.get("/download/master_pdf")
+async def download_master_pdf(request: Request):
+    """Download the generated master PDF"""
+    return download_file(request, FERRANTE_DIR / "Ferrante_Master.linked.pdf", "application/pdf",
+                         "Master PDF not found. Process documents first.")
+
 @app.get("/download/candidate_map_json")
-async def download_candidate_map_json():
+async def download_candidate_map_json(request: Request):
     """Download the candidate map as JSON"""
-    file_path = Path("workspace/exports/ferrante_api/Ferrante_candidate_hyperlink_map.json")
-    if not file_path.exists():
-        raise HTTPException(status_code=404, detail="Candidate map JSON not found. Process documents first.")
-    
-    return FileResponse(
-        path=str(file_path),
-        filename="Ferrante_candidate_hyperlink_map.json",
-        media_type="application/json"
-    )
+    return download_file(request, FERRANTE_DIR / "Ferrante_candidate_hyperlink_map.json", "application/json",
+                         "Candidate map JSON not found. Process documents first.")
 
 @app.get("/download/candidate_map_csv")
-async def download_candidate_map_csv():
+async def download_candidate_map_csv(request: Request):
     """Download the candidate map as CSV"""
-    file_path = Path("workspace/exports/ferrante_api/Ferrante_candidate_hyperlink_map.csv")
-    if not file_path.exists():
-        raise HTTPException(status_code=404, detail="Candidate map CSV not found. Process documents first.")
+    return download_file(request, FERRANTE_DIR / "Ferrante_candidate_hyperlink_map.csv", "text/csv",
+                         "Candidate map CSV not found. Process documents first.")
+
+def _iter_candidate_csv(rows: List[List[Any]]):
+    """Yield the candidate map as CSV one row at a time through a reused buffer"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in chain([DeterministicHyperlinkDetector.CANDIDATE_CSV_HEADER], rows):
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+@app.get("/stream/candidates.csv")
+async def stream_candidates_csv(request: Request):
+    """Stream the latest candidate map as CSV from memory"""
+    latest = _latest_candidates
+    if latest is None or latest[0] != _file_identity(FERRANTE_DIR / "Ferrante_candidate_hyperlink_map.csv"):
+        # Not processed by this server process, or another worker published a newer map: serve the file
+        return await download_candidate_map_csv(request)
+    rows = latest[1]
     
-    return FileResponse(
-        path=str(file_path),
-        filename="Ferrante_candidate_hyperlink_map.csv",
-        media_type="text/csv"
+    return StreamingResponse(
+        _iter_candidate_csv(rows),
+        media_type="text/csv",
+        headers={"Content-Disposition": 'attachment; filename="Ferrante_candidate_hyperlink_map.csv"'}
     )
 
 if __name__ == "__main__":
     import uvicorn
     # Use FERRANTE_PORT environment variable or default to 8002 to avoid conflicts with main server
     port = int(os.environ.get('FERRANTE_PORT', '8002'))
-    uvicorn.run(app, host="0.0.0.0", port=port)
\ No newline at end of file
+    # Import string + app_dir are required for workers > 1; "auto" picks uvloop/httptools when installed
+    uvicorn.run(
+        "ferrante_api:app",
+        app_dir=os.path.dirname(os.path.abspath(__file__)),
+        host="0.0.0.0",
+        port=port,
+        loop="auto",
+        http="auto",
+        workers=int(os.environ.get('FERRANTE_UVICORN_WORKERS', '4'))
+    )
\ No newline at end of file
@@ -15,24 +15,45 @@ from pathlib import Path
 from typing import List, Dict, Tuple, Optional, Any
 import subprocess
 import os
-from dataclasses import dataclass, asdict
-import pandas as pd
+from dataclasses import dataclass, asdict, is_dataclass
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import repeat
 
-@dataclass
+# Documents with fewer pages are scanned in-process; process startup outweighs the gain
+PARALLEL_PAGE_THRESHOLD = 32
+# PyMuPDF page parsing stops scaling past a handful of processes
+MAX_PAGE_WORKERS = 6
+# qpdf/ocrmypdf subprocesses run side by side; (workers x OCR jobs) ~ CPU threads
+PREFLIGHT_WORKERS = max(1, (os.cpu_count() or 4) // 2)
+OCR_JOBS_PER_PDF = 2
+# search_for fallback flag sets, cheapest and most common hit first
+SEARCH_FLAG_COMBINATIONS = (
+    0,  # Default
+    fitz.TEXT_PRESERVE_LIGATURES,
+    fitz.TEXT_PRESERVE_WHITESPACE,
+    fitz.TEXT_PRESERVE_LIGATURES | fitz.TEXT_PRESERVE_WHITESPACE
+)
+# Plain text extraction for regex scanning: no ligature or whitespace preservation
+_SCAN_TEXT_FLAGS = fitz.TEXT_MEDIABOX_CLIP
+# Punctuation glued to extracted words ("A," "(Tab") that needles never carry
+WORD_EDGE_PUNCTUATION = "()[]{}<>.,;:!?\"'“”‘’"
+
+@dataclass(slots=True)
 class Rectangle:
     x0: float
     y0: float
     x1: float
     y1: float
 
-@dataclass
+@dataclass(slots=True)
 class DestinationCandidate:
     dest_page: int
     confidence: float
     method: str
     title: str = ""
 
-@dataclass
+@dataclass(slots=True)
 class HyperlinkReference:
     source_file: str
     source_page: int
@@ -47,7 +68,7 @@ class HyperlinkReference:
     top_method: str
     reviewer_choice: Optional[int] = None
 
-@dataclass
+@dataclass(slots=True)
 class ValidationReport:
     total_detected: int
     auto_linked: int
@@ -56,6 +77,12 @@ class ValidationReport:
     broken_links: int
     coverage_percent: float
 
+def _json_default(obj: Any) -> Any:
+    """json.dumps fallback: slotted records as shallow field dicts, anything else as str"""
+    if is_dataclass(obj):
+        return {name: getattr(obj, name) for name in obj.__slots__}
+    return str(obj)
+
 class FerranteBlueprint:
     """Complete implementation of the 100% accurate hyperlink detection blueprint"""
     
@@ -70,27 +97,100 @@ class FerranteBlueprint:
         'under_advisement': re.compile(r'\bunder advisement\b', re.IGNORECASE),
         'tr_cite': re.compile(r'\b(?:TR|Trial\s+Record)\s*(?:p\.|pp\.|page|pages)?\s*(\d{1,4})\b', re.IGNORECASE)
     }
+    
+    # Every pattern starts with \b and a keyword: one scan for the keywords finds all candidate starts.
+    # (?<!\w) is \b before a letter; the lookahead on initials lets most positions fail fast.
+    TRIGGER_PATTERN = re.compile(
+        r'(?<!\w)(?=[aerstu])(?:(?P<exhibit>exhibit)|(?P<tab>tab)|(?P<schedule>schedule)|(?P<affidavit>affidavit)'
+        r'|(?P<under>under)|(?P<refusal>refusal)|(?P<tr>tr))',
+        re.IGNORECASE
+    )
+    TRIGGER_TYPES = {
+        'exhibit': ('exhibit',),
+        'tab': ('tab',),
+        'schedule': ('schedule',),
+        'affidavit': ('affidavit',),
+        'under': ('undertaking', 'under_advisement'),
+        'refusal': ('refusal',),
+        'tr': ('tr_cite',)
+    }
+    
+    # Trial Record anchor patterns; step 2 matches them against lower-cased page text
+    _ANCHOR_PATTERNS = {
+        'exhibit': re.compile(r'exhibit\s+([a-z0-9-]+)'),
+        'tab': re.compile(r'tab\s+(\d+)'),
+        'schedule': re.compile(r'schedule\s+([a-z0-9]+)'),
+        'affidavit': re.compile(r'affidavit\s+of\s+([a-z\s]+)')
+    }
+    
+    # Trial Record page facts for destination scoring: keywords present and the values that follow them
+    INDEX_TERMS = ('exhibit', 'tab', 'schedule', 'affidavit', 'undertaking', 'refusal', 'under advisement')
+    INDEX_EXHIBIT_PATTERN = re.compile(r'(?=exhibit ([^ :\n]+)[: \n])')  # "exhibit {v}:" / "exhibit {v} " / "exhibit {v}\n"
+    INDEX_PREFIX_PATTERNS = {
+        'tabs': re.compile(r'(?=tab (.{1,3}))'),
+        'schedules': re.compile(r'(?=schedule (.{1,3}))')
+    }
+    # "tab {v}" / "schedule {v}" are looked up by prefix; PATTERNS capture at most 3 characters
+    INDEX_PREFIX_LEN = 3
+    # Keyword every non-zero score of a reference type requires; tr_cite scores every page
+    SCORE_TERMS = {
+        'exhibit': 'exhibit',
+        'tab': 'tab',
+        'schedule': 'schedule',
+        'affidavit': 'affidavit',
+        'undertaking': 'undertaking',
+        'refusal': 'refusal',
+        'under_advisement': 'under advisement'
+    }
 
     def __init__(self, output_dir: str = "workspace/exports/ferrante"):
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
         self.anchor_map = {}
         self.trial_record_index = {}
+        self.page_index = {}
+        self.term_pages = {}
+        self.value_pages = {}
+        self._brief_offsets = {}
+        self._candidate_cache = {}
+        self._source_docs: Dict[str, fitz.Document] = {}
         self.page_labels = {}
         
+    def _source_doc(self, pdf_path: str) -> fitz.Document:
+        """Open a source PDF once per run; later steps reuse the already-parsed document"""
+        doc = self._source_docs.get(pdf_path)
+        if doc is None:
+            doc = self._source_docs[pdf_path] = fitz.open(pdf_path)
+        return doc
+    
+    def _close_source_docs(self):
+        """Release the source PDFs opened during this run"""
+        for doc in self._source_docs.values():
+            doc.close()
+        self._source_docs = {}
+        
     def step_1_preflight(self, pdf_paths: List[str]) -> List[str]:
         """1) Preflight: Normalize PDFs, OCR if needed, extract page labels"""
         print("🔧 Step 1: PDF Preflight Processing...")
         
-        normalized_paths = []
-        for pdf_path in pdf_paths:
-            normalized_path = self._normalize_pdf(pdf_path)
-            normalized_paths.append(normalized_path)
-            
+        # qpdf runs are independent subprocesses
+        with ThreadPoolExecutor(max_workers=PREFLIGHT_WORKERS) as executor:
+            linearized_paths = list(executor.map(self._linearize_pdf, pdf_paths))
+        
+        # PyMuPDF is not thread-safe: scanned-page checks run here, only ocrmypdf runs on the pool
+        ocr_inputs = [pdf_path for pdf_path, linearized_path in zip(pdf_paths, linearized_paths)
+                      if linearized_path is None and self._needs_ocr(pdf_path)]
+        with ThreadPoolExecutor(max_workers=PREFLIGHT_WORKERS) as executor:
+            ocr_paths = dict(zip(ocr_inputs, executor.map(self._apply_ocr, ocr_inputs)))
+        
+        normalized_paths = [
+            linearized_path or ocr_paths.get(pdf_path) or pdf_path
+            for pdf_path, linearized_path in zip(pdf_paths, linearized_paths)
+        ]
         return normalized_paths
 
-    def _normalize_pdf(self, pdf_path: str) -> str:
-        """Normalize PDF with linearization and OCR if needed"""
+    def _linearize_pdf(self, pdf_path: str) -> Optional[str]:
+        """Linearize PDF with qpdf; None when qpdf is unavailable or fails"""
         input_path = Path(pdf_path)
         output_path = self.output_dir / f"normalized_{input_path.name}"
         
@@ -98,7 +198,7 @@ class FerranteBlueprint:
             # Linearize with qpdf if available
             result = subprocess.run([
                 'qpdf', '--linearize', str(input_path), str(output_path)
-            ], capture_output=True, text=True)
+            ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
             
             if result.returncode == 0:
                 print(f"   ✅ Linearized: {input_path.name}")
@@ -109,28 +209,21 @@ class FerranteBlueprint:
         except FileNotFoundError:
             print(f"   ⚠️  qpdf not found, using original: {input_path.name}")
             
-        # Check if OCR is needed (detect scanned pages)
-        if self._needs_ocr(pdf_path):
-            ocr_path = self._apply_ocr(pdf_path)
-            if ocr_path:
-                return ocr_path
-                
-        return pdf_path
+        return None
 
     def _needs_ocr(self, pdf_path: str) -> bool:
         """Check if PDF contains scanned pages that need OCR"""
         doc = fitz.open(pdf_path)
         
-        # Sample first 3 pages to check for text content
-        for page_num in range(min(3, len(doc))):
-            page = doc[page_num]
-            text = page.get_text().strip()
-            if len(text) < 50:  # Very little text suggests scanned page
-                doc.close()
-                return True
-                
-        doc.close()
-        return False
+        try:
+            # Sample first 3 pages to check for text content
+            for page_num in range(min(3, len(doc))):
+                text = doc[page_num].get_text("text", sort=False, flags=_SCAN_TEXT_FLAGS).strip()
+                if len(text) < 50:  # Very little text suggests scanned page
+                    return True
+            return False
+        finally:
+            doc.close()
 
     def _apply_ocr(self, pdf_path: str) -> Optional[str]:
         """Apply OCR using ocrmypdf"""
@@ -138,10 +231,13 @@ class FerranteBlueprint:
         output_path = self.output_dir / f"ocr_{input_path.name}"
         
         try:
+            # Single-threaded Tesseract per page; parallelism comes from --jobs and concurrent PDFs
             result = subprocess.run([
                 'ocrmypdf', '--skip-text', '--deskew', '--clean-final',
+                '--jobs', str(OCR_JOBS_PER_PDF),
                 str(input_path), str(output_path)
-            ], capture_output=True, text=True)
+            ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+               env={**os.environ, 'OMP_THREAD_LIMIT': '1'})
             
             if result.returncode == 0:
                 print(f"   ✅ OCR applied: {input_path.name}")
@@ -158,12 +254,25 @@ class FerranteBlueprint:
         """2) Create anchors for Trial Record destinations"""
         print("🔗 Step 2: Anchoring Trial Record...")
         
-        doc = fitz.open(trial_record_path)
+        doc = self._source_doc(trial_record_path)
+        page_count = len(doc)
+        
+        if page_count < PARALLEL_PAGE_THRESHOLD:
+            page_texts = [page.get_text("text", sort=False, flags=_SCAN_TEXT_FLAGS).lower() for page in doc.pages()]
+        else:
+            # Text extraction dominates; pages are extracted across processes, anchors built here in page order
+            workers = min(os.cpu_count() or 1, MAX_PAGE_WORKERS)
+            chunksize = max(1, page_count // (4 * workers))
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                page_texts = list(executor.map(_anchor_page_text, repeat(trial_record_path), range(page_count),
+                                               chunksize=chunksize))
+        
         anchors = {}
+        self.term_pages = {term: [] for term in self.INDEX_TERMS}
+        self.value_pages = {'exhibit': {}, 'tab': {}, 'schedule': {}}
+        self._candidate_cache = {}
         
-        for page_num in range(len(doc)):
-            page = doc[page_num]
-            page_text = page.get_text().lower()
+        for page_num, page_text in enumerate(page_texts):
             abs_page = page_num + 1
             
             # Create base anchor for each page
@@ -182,8 +291,14 @@ class FerranteBlueprint:
             
             # Build searchable index
             self.trial_record_index[abs_page] = page_text
+            facts = self.page_index[abs_page] = self._page_facts(page_text)
             
-        doc.close()
+            # Inverted indexes so scoring only visits pages that can match
+            for term in facts["terms"]:
+                self.term_pages[term].append(abs_page)
+            for ref_type in self.value_pages:
+                for value in facts[f"{ref_type}s"]:
+                    self.value_pages[ref_type].setdefault(value, []).append(abs_page)
         
         # Save anchor map
         anchor_file = self.output_dir / "anchor_map.json"
@@ -196,8 +311,7 @@ class FerranteBlueprint:
 
     def _detect_exhibit_anchors(self, page_text: str, abs_page: int, anchors: Dict):
         """Detect Exhibit anchors on page"""
-        exhibit_pattern = re.compile(r'exhibit\s+([a-z0-9-]+)', re.IGNORECASE)
-        for match in exhibit_pattern.finditer(page_text):
+        for match in self._ANCHOR_PATTERNS['exhibit'].finditer(page_text):
             exhibit_id = match.group(1).upper()
             anchor_id = f"TR-Exhibit-{exhibit_id}"
             if anchor_id not in anchors:
@@ -209,8 +323,7 @@ class FerranteBlueprint:
 
     def _detect_tab_anchors(self, page_text: str, abs_page: int, anchors: Dict):
         """Detect Tab anchors on page"""
-        tab_pattern = re.compile(r'tab\s+(\d+)', re.IGNORECASE)
-        for match in tab_pattern.finditer(page_text):
+        for match in self._ANCHOR_PATTERNS['tab'].finditer(page_text):
             tab_id = match.group(1)
             anchor_id = f"TR-Tab-{tab_id}"
             if anchor_id not in anchors:
@@ -222,8 +335,7 @@ class FerranteBlueprint:
 
     def _detect_schedule_anchors(self, page_text: str, abs_page: int, anchors: Dict):
         """Detect Schedule anchors on page"""
-        schedule_pattern = re.compile(r'schedule\s+([a-z0-9]+)', re.IGNORECASE)
-        for match in schedule_pattern.finditer(page_text):
+        for match in self._ANCHOR_PATTERNS['schedule'].finditer(page_text):
             schedule_id = match.group(1).upper()
             anchor_id = f"TR-Schedule-{schedule_id}"
             if anchor_id not in anchors:
@@ -235,10 +347,10 @@ class FerranteBlueprint:
 
     def _detect_affidavit_anchors(self, page_text: str, abs_page: int, anchors: Dict):
         """Detect Affidavit anchors on page"""
-        affidavit_pattern = re.compile(r'affidavit\s+of\s+([a-z\s]+)', re.IGNORECASE)
-        for match in affidavit_pattern.finditer(page_text):
+        for match in self._ANCHOR_PATTERNS['affidavit'].finditer(page_text):
             name = match.group(1).strip()
-            last_name = name.split()[-1] if name.split() else name
+            name_parts = name.split()
+            last_name = name_parts[-1] if name_parts else name
             anchor_id = f"TR-Affidavit-{last_name.title()}"
             if anchor_id not in anchors:
                 anchors[anchor_id] = {
@@ -269,21 +381,14 @@ class FerranteBlueprint:
         """3) Enhanced OCR Processing for all documents"""
         print("📝 Step 3: Enhanced OCR Processing...")
         
-        ocr_processed_paths = []
-        
-        for doc_path in document_paths:
-            # Apply enhanced OCR processing with confidence scoring
-            processed_path = self._apply_enhanced_ocr(doc_path)
-            ocr_processed_paths.append(processed_path if processed_path else doc_path)
+        # PyMuPDF is not thread-safe: decide which PDFs need OCR here, then run ocrmypdf one PDF per worker
+        ocr_inputs = [doc_path for doc_path in document_paths if self._needs_ocr(doc_path)]
+        with ThreadPoolExecutor(max_workers=PREFLIGHT_WORKERS) as executor:
+            ocr_paths = dict(zip(ocr_inputs, executor.map(self._apply_ocr, ocr_inputs)))
+        ocr_processed_paths = [ocr_paths.get(doc_path) or doc_path for doc_path in document_paths]
             
         print(f"   ✅ OCR processing completed for {len(ocr_processed_paths)} documents")
         return ocr_processed_paths
-        
-    def _apply_enhanced_ocr(self, pdf_path: str) -> Optional[str]:
-        """Apply enhanced OCR with confidence scoring and text validation"""
-        if self._needs_ocr(pdf_path):
-            return self._apply_ocr(pdf_path)
-        return None
 
     def step_4_detect_references(self, brief_paths: List[str]) -> List[HyperlinkReference]:
         """4) Detect references in Briefs with exact rectangles"""
@@ -293,50 +398,90 @@ class FerranteBlueprint:
         
         for brief_path in brief_paths:
             filename = Path(brief_path).name
-            doc = fitz.open(brief_path)
+            doc = self._source_doc(brief_path)
+            page_count = len(doc)
+            references_before = len(all_references)
             
-            for page_num in range(len(doc)):
-                page = doc[page_num]
-                page_text = page.get_text()
-                
-                # Detect all pattern types
-                for ref_type, pattern in self.PATTERNS.items():
-                    for match in pattern.finditer(page_text):
-                        ref_value = match.group(1) if match.lastindex else match.group(0)
-                        
-                        # Create needle for rectangle search
-                        needle = self._create_needle(ref_type, ref_value, match.group(0))
-                        
-                        # Find rectangles with advanced search
-                        rects = self._find_rectangles_advanced(page, needle)
-                        
-                        # Get context snippet
-                        snippet = self._get_context_snippet(page_text, match.start(), 60)
-                        
-                        # Create reference with empty candidates (will be filled in step 4)
-                        reference = HyperlinkReference(
-                            source_file=filename,
-                            source_page=page_num + 1,
-                            ref_type=ref_type,
-                            ref_value=ref_value,
-                            snippet=snippet,
-                            needle=needle,
-                            rects=rects,
-                            dest_candidates=[],
-                            top_dest_page=0,
-                            top_confidence=0.0,
-                            top_method=""
-                        )
-                        
-                        all_references.append(reference)
+            if page_count < PARALLEL_PAGE_THRESHOLD:
+                for page_num, page in enumerate(doc.pages()):
+                    all_references.extend(self._detect_page_references(page, page_num, filename))
+            else:
+                # Pages are independent; scan across processes and merge in page order
+                workers = min(os.cpu_count() or 1, MAX_PAGE_WORKERS)
+                chunksize = max(1, page_count // (4 * workers))
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    for page_refs in executor.map(_scan_brief_page, repeat(brief_path), range(page_count),
+                                                  repeat(filename), chunksize=chunksize):
+                        all_references.extend(page_refs)
             
-            doc.close()
-            print(f"   ✅ {filename}: {len([r for r in all_references if r.source_file == filename])} references")
+            print(f"   ✅ {filename}: {len(all_references) - references_before} references")
         
         print(f"   📊 Total references detected: {len(all_references)}")
         return all_references
 
-    def _create_needle(self, ref_type: str, ref_value: str, full_match: str) -> str:
+    @classmethod
+    def _detect_page_references(cls, page: fitz.Page, page_num: int, filename: str) -> List[HyperlinkReference]:
+        """Detect references on a single Brief page"""
+        references = []
+        page_text = page.get_text("text", sort=False, flags=_SCAN_TEXT_FLAGS)
+        page_words = None
+        
+        # Detect all pattern types
+        for ref_type, matches in cls._match_patterns(page_text).items():
+            for match in matches:
+                ref_value = match.group(1) if match.lastindex else match.group(0)
+                
+                # Create needle for rectangle search
+                needle = cls._create_needle(ref_type, ref_value, match.group(0))
+                
+                # Find rectangles with advanced search (word boxes extracted once per page)
+                if page_words is None:
+                    page_words = cls._page_words(page)
+                rects = cls._find_rectangles_advanced(page, needle, page_words)
+                
+                # Get context snippet
+                snippet = cls._get_context_snippet(page_text, match.start(), 60)
+                
+                # Create reference with empty candidates (will be filled in step 5)
+                reference = HyperlinkReference(
+                    source_file=filename,
+                    source_page=page_num + 1,
+                    ref_type=ref_type,
+                    ref_value=ref_value,
+                    snippet=snippet,
+                    needle=needle,
+                    rects=rects,
+                    dest_candidates=[],
+                    top_dest_page=0,
+                    top_confidence=0.0,
+                    top_method=""
+                )
+                
+                references.append(reference)
+        
+        return references
+
+    @classmethod
+    def _match_patterns(cls, page_text: str) -> Dict[str, List[re.Match]]:
+        """Per-type PATTERNS matches, identical to running each pattern's finditer, in one text scan"""
+        matches_by_type = {ref_type: [] for ref_type in cls.PATTERNS}
+        match_ends = dict.fromkeys(cls.PATTERNS, 0)
+        
+        for trigger in cls.TRIGGER_PATTERN.finditer(page_text):
+            start = trigger.start()
+            for ref_type in cls.TRIGGER_TYPES[trigger.lastgroup]:
+                # finditer never starts a match inside the same pattern's previous match
+                if start < match_ends[ref_type]:
+                    continue
+                match = cls.PATTERNS[ref_type].match(page_text, start)
+                if match:
+                    matches_by_type[ref_type].append(match)
+                    match_ends[ref_type] = match.end()
+        
+        return matches_by_type
+
+    @staticmethod
+    def _create_needle(ref_type: str, ref_value: str, full_match: str) -> str:
         """Create search needle for rectangle detection"""
         if ref_type == 'exhibit':
             return f"Exhibit {ref_value}"
@@ -349,49 +494,90 @@ class FerranteBlueprint:
         else:
             return full_match
 
-    def _find_rectangles_advanced(self, page: fitz.Page, needle: str) -> List[Rectangle]:
+    @staticmethod
+    def _word_key(word: str) -> str:
+        """Case-insensitive comparison key for one extracted or needle word"""
+        return word.strip(WORD_EDGE_PUNCTUATION).lower()
+
+    @classmethod
+    def _page_words(cls, page: fitz.Page) -> Tuple[List[tuple], List[str], Dict[str, List[int]]]:
+        """Word boxes of a page in reading order, their keys, and key -> word positions"""
+        # Same flags as the scanned text, so needles and words agree on expanded ligatures
+        words = page.get_text("words", sort=False, flags=_SCAN_TEXT_FLAGS)
+        keys = [cls._word_key(word[4]) for word in words]
+        positions = {}
+        for position, key in enumerate(keys):
+            positions.setdefault(key, []).append(position)
+        return words, keys, positions
+
+    @classmethod
+    def _find_rectangles_advanced(cls, page: fitz.Page, needle: str,
+                                  page_words: Tuple[List[tuple], List[str], Dict[str, List[int]]]) -> List[Rectangle]:
         """Find rectangles with ligature/dehyphenation handling and fallbacks"""
-        rectangles = []
+        rectangles = []  # [x0, y0, x1, y1] rows; Rectangle objects only for the boxes kept
+        words, keys, positions = page_words
+        needle_words = [word for word in needle.split() if cls._word_key(word)]
+        needle_keys = [cls._word_key(word) for word in needle_words]
+        
+        # Walk the word index: consecutive words matching the needle, one box per text line like search_for
+        if needle_keys:
+            span = len(needle_keys)
+            for start in positions.get(needle_keys[0], ()):
+                if keys[start:start + span] != needle_keys:
+                    continue
+                line = None
+                for word, needle_word in zip(words[start:start + span], needle_words):
+                    x0, y0, x1, y1, text, block_no, line_no, _ = word
+                    if text.lower() != needle_word.lower():
+                        # Trim punctuation the needle does not carry ("A," "(Tab") to the needle's glyphs
+                        hits = page.search_for(needle_word, clip=fitz.Rect(x0, y0, x1, y1))
+                        if hits:
+                            x0, y0, x1, y1 = hits[0]
+                    if (block_no, line_no) != line:
+                        line = (block_no, line_no)
+                        rectangles.append([x0, y0, x1, y1])
+                    else:
+                        row = rectangles[-1]
+                        row[0], row[1] = min(row[0], x0), min(row[1], y0)
+                        row[2], row[3] = max(row[2], x1), max(row[3], y1)
+        
+        # Text split oddly into words (hyphenation, glued tokens): fall back to MuPDF search variations
+        if not rectangles:
+            rectangles = cls._search_variations(page, needle)
+        
+        # Remove duplicates (same coordinates on a 1-unit grid of the top-left corner)
+        unique_rects = []
+        seen = set()
+        for x0, y0, x1, y1 in rectangles:
+            key = (int(x0), int(y0))
+            if key not in seen:
+                seen.add(key)
+                unique_rects.append(Rectangle(x0, y0, x1, y1))
         
-        # Try multiple search variations
-        search_variations = [
+        return unique_rects
+
+    @staticmethod
+    def _search_variations(page: fitz.Page, needle: str) -> List[List[float]]:
+        """First search_for hit over case variations and flag sets, as [x0, y0, x1, y1] rows"""
+        # Distinct variations only: needles without letters have a single case form
+        search_variations = dict.fromkeys([
             needle,
             needle.lower(),
             needle.upper(),
             needle.title()
-        ]
+        ])
         
         for variation in search_variations:
-            # Search with different flags
-            flag_combinations = [
-                fitz.TEXT_PRESERVE_LIGATURES,
-                fitz.TEXT_PRESERVE_WHITESPACE,
-                fitz.TEXT_PRESERVE_LIGATURES | fitz.TEXT_PRESERVE_WHITESPACE,
-                0  # Default
-            ]
-            
-            for flags in flag_combinations:
+            # Search with different flags, default first
+            for flags in SEARCH_FLAG_COMBINATIONS:
                 rects = page.search_for(variation, flags=flags)
                 if rects:
-                    rectangles.extend([Rectangle(r.x0, r.y0, r.x1, r.y1) for r in rects])
-                    break
-                    
-            if rectangles:
-                break
-        
-        # Remove duplicates (same coordinates)
-        unique_rects = []
-        for rect in rectangles:
-            is_duplicate = any(
-                abs(rect.x0 - ur.x0) < 1 and abs(rect.y0 - ur.y0) < 1 
-                for ur in unique_rects
-            )
-            if not is_duplicate:
-                unique_rects.append(rect)
+                    return [[r.x0, r.y0, r.x1, r.y1] for r in rects]
         
-        return unique_rects
+        return []
 
-    def _get_context_snippet(self, text: str, match_index: int, context_length: int) -> str:
+    @staticmethod
+    def _get_context_snippet(text: str, match_index: int, context_length: int) -> str:
         """Extract context around the match"""
         start = max(0, match_index - context_length)
         end = min(len(text), match_index + context_length)
@@ -401,6 +587,9 @@ class FerranteBlueprint:
         """5) Map each reference to Trial Record destination with scoring"""
         print("🎯 Step 5: Mapping references to destinations...")
         
+        # Scores depend only on (ref_type, ref_value) and the current Trial Record index
+        self._candidate_cache = {}
+        
         for reference in references:
             candidates = self._score_destinations(reference)
             reference.dest_candidates = candidates
@@ -416,66 +605,103 @@ class FerranteBlueprint:
 
     def _score_destinations(self, reference: HyperlinkReference) -> List[DestinationCandidate]:
         """Score all possible destinations for a reference"""
-        candidates = []
+        scored = []
         ref_type = reference.ref_type
         ref_value = reference.ref_value.lower()
         
-        for page_num, page_text in self.trial_record_index.items():
-            confidence, method = self._calculate_confidence(ref_type, ref_value, page_text)
+        # Identical references always score identically
+        cache_key = (ref_type, ref_value)
+        cached = self._candidate_cache.get(cache_key)
+        if cached is not None:
+            return list(cached)
+        
+        for page_num in self._candidate_pages(ref_type, ref_value):
+            confidence, method = self._calculate_confidence(ref_type, ref_value, page_num)
             
             if confidence > 0:
-                # Get title from anchors if available
-                title = self._get_page_title(page_num)
-                candidate = DestinationCandidate(page_num, confidence, method, title)
-                candidates.append(candidate)
+                scored.append((page_num, confidence, method))
         
         # Sort by confidence (desc) then by page number (asc)
-        candidates.sort(key=lambda x: (-x.confidence, x.dest_page))
-        return candidates[:3]  # Top 3
+        scored.sort(key=lambda x: (-x[1], x[0]))
+        
+        # Get titles from anchors for the kept candidates only
+        top_candidates = [
+            DestinationCandidate(page_num, confidence, method, self._get_page_title(page_num))
+            for page_num, confidence, method in scored[:3]  # Top 3
+        ]
+        self._candidate_cache[cache_key] = top_candidates
+        return list(top_candidates)
+
+    def _candidate_pages(self, ref_type: str, ref_value: str) -> List[int]:
+        """Trial Record pages that can score above zero for a reference, via the inverted indexes"""
+        term = self.SCORE_TERMS.get(ref_type)
+        if term is None or not self.term_pages:
+            # tr_cite, or an index assigned without step 2: score every page
+            return list(self.trial_record_index)
+        
+        # Exact matches are the only 1.0 scores: three of them already fill the top 3
+        exact_pages = self.value_pages.get(ref_type, {}).get(ref_value, [])
+        if len(exact_pages) >= 3:
+            return exact_pages[:3]
+        return self.term_pages[term]
+
+    @classmethod
+    def _page_facts(cls, page_text: str) -> Dict[str, set]:
+        """Keywords on a Trial Record page and the exact values that follow them"""
+        facts = {
+            "terms": {term for term in cls.INDEX_TERMS if term in page_text},
+            "exhibits": set(cls.INDEX_EXHIBIT_PATTERN.findall(page_text))
+        }
+        for name, pattern in cls.INDEX_PREFIX_PATTERNS.items():
+            facts[name] = {value[:length] for value in pattern.findall(page_text)
+                           for length in range(1, len(value) + 1)}
+        return facts
 
-    def _calculate_confidence(self, ref_type: str, ref_value: str, page_text: str) -> Tuple[float, str]:
+    def _calculate_confidence(self, ref_type: str, ref_value: str, page_num: int) -> Tuple[float, str]:
         """Calculate confidence score using blueprint rules"""
+        page_text = self.trial_record_index[page_num]
+        facts = self.page_index.get(page_num)
+        if facts is None:
+            # Index assigned without step 2: derive the page facts on first use
+            facts = self.page_index[page_num] = self._page_facts(page_text)
+        terms = facts["terms"]
         
         if ref_type == 'exhibit':
             # Exact phrase matching
-            exact_patterns = [
-                f"exhibit {ref_value}:",
-                f"exhibit {ref_value} ",
-                f"exhibit {ref_value}\n"
-            ]
-            for pattern in exact_patterns:
-                if pattern in page_text:
-                    return 1.0, "exact_exhibit"
+            if ref_value in facts["exhibits"]:
+                return 1.0, "exact_exhibit"
             
             # Token fallback
-            if "exhibit" in page_text and ref_value in page_text:
+            if "exhibit" in terms and ref_value in page_text:
                 return 0.85, "token_exhibit"
                 
         elif ref_type == 'tab':
-            if f"tab {ref_value}" in page_text:
+            if (ref_value in facts["tabs"] if len(ref_value) <= self.INDEX_PREFIX_LEN
+                    else f"tab {ref_value}" in page_text):
                 return 1.0, "exact_tab"
-            if "tab" in page_text and ref_value in page_text:
+            if "tab" in terms and ref_value in page_text:
                 return 0.85, "token_tab"
                 
         elif ref_type == 'schedule':
-            if f"schedule {ref_value}" in page_text:
+            if (ref_value in facts["schedules"] if len(ref_value) <= self.INDEX_PREFIX_LEN
+                    else f"schedule {ref_value}" in page_text):
                 return 1.0, "exact_schedule"
-            if "schedule" in page_text and ref_value in page_text:
+            if "schedule" in terms and ref_value in page_text:
                 return 0.85, "token_schedule"
                 
         elif ref_type == 'affidavit':
-            name_lower = ref_value.lower()
-            if f"affidavit of {name_lower}" in page_text:
+            if "affidavit" not in terms:
+                return 0.0, "no_match"
+            exact_phrase, name_parts = self._affidavit_probes(ref_value)
+            if exact_phrase in page_text:
                 return 1.0, "exact_affidavit"
             
             # Token matching with name parts
-            name_parts = name_lower.split()
-            if "affidavit" in page_text and any(part in page_text for part in name_parts if len(part) > 2):
+            if any(part in page_text for part in name_parts):
                 return 0.90, "token_affidavit"
                 
         elif ref_type in ['undertaking', 'refusal', 'under_advisement']:
-            section_term = ref_type.replace('_', ' ')
-            if section_term in page_text:
+            if self.SCORE_TERMS[ref_type] in terms:
                 return 0.80, "section_match"
                 
         elif ref_type == 'tr_cite':
@@ -488,6 +714,12 @@ class FerranteBlueprint:
         
         return 0.0, "no_match"
 
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def _affidavit_probes(name_lower: str) -> Tuple[str, Tuple[str, ...]]:
+        """Exact phrase and significant name parts for a lower-cased affidavit name"""
+        return f"affidavit of {name_lower}", tuple(part for part in name_lower.split() if len(part) > 2)
+
     def _get_page_title(self, page_num: int) -> str:
         """Get page title from anchor map"""
         for anchor in self.anchor_map.values():
@@ -499,19 +731,25 @@ class FerranteBlueprint:
         """6) Export candidate map for review and approval"""
         print("📋 Step 6: Exporting candidate hyperlink map...")
         
-        # JSON export
-        json_data = {
+        # JSON export, streamed one reference at a time
+        summary = {
             "case": "Ferrante",
             "total_references": len(references),
             "by_type": self._count_by_type(references),
             "high_confidence": len([r for r in references if r.top_confidence >= 0.92]),
-            "needs_review": len([r for r in references if r.top_confidence < 0.92]),
-            "references": [asdict(ref) for ref in references]
+            "needs_review": len([r for r in references if r.top_confidence < 0.92])
         }
         
         json_path = self.output_dir / "Ferrante_candidate_hyperlink_map.json"
         with open(json_path, 'w') as f:
-            json.dump(json_data, f, indent=2, default=str)
+            f.write('{\n')
+            for key, value in summary.items():
+                f.write(f'  {json.dumps(key)}: {json.dumps(value)},\n')
+            f.write('  "references": [')
+            for i, ref in enumerate(references):
+                f.write(',\n    ' if i else '\n    ')
+                f.write(json.dumps(ref, default=_json_default))
+            f.write('\n  ]\n}\n' if references else ']\n}\n')
         
         # CSV export
         csv_path = self.output_dir / "Ferrante_candidate_hyperlink_map.csv"
@@ -557,39 +795,46 @@ class FerranteBlueprint:
         
         # Track page offsets
         brief_page_count = 0
+        self._brief_offsets = {}
         
         # Add Brief documents
         for brief_path in brief_paths:
-            brief_doc = fitz.open(brief_path)
+            brief_doc = self._source_doc(brief_path)
+            self._brief_offsets.setdefault(Path(brief_path).name, brief_page_count)
             master_doc.insert_pdf(brief_doc)
             brief_page_count += len(brief_doc)
-            brief_doc.close()
         
         # Add Trial Record
-        tr_doc = fitz.open(trial_record_path)
+        tr_doc = self._source_doc(trial_record_path)
         tr_offset = brief_page_count
         master_doc.insert_pdf(tr_doc)
-        tr_doc.close()
+        # Sources are fully copied into the master; this is their last use in the run
+        self._close_source_docs()
         
-        # Insert hyperlinks
-        links_added = 0
+        # Group link rectangles by master page so each page is resolved once
+        links_by_page = {}
         for ref in references:
             if ref.top_confidence >= min_confidence and ref.rects:
                 source_page_global = self._get_global_page_number(ref.source_file, ref.source_page, brief_paths)
                 target_page_global = tr_offset + ref.top_dest_page - 1
                 
                 if 0 <= source_page_global < len(master_doc):
-                    page = master_doc[source_page_global]
-                    
-                    for rect in ref.rects:
-                        link_rect = fitz.Rect(rect.x0, rect.y0, rect.x1, rect.y1)
-                        page.insert_link({
-                            "from": link_rect,
-                            "kind": fitz.LINK_GOTO,
-                            "page": target_page_global,
-                            "to": fitz.Point(0, 0)
-                        })
-                        links_added += 1
+                    page_links = links_by_page.setdefault(source_page_global, [])
+                    page_links.extend((rect, target_page_global) for rect in ref.rects)
+        
+        # Insert hyperlinks
+        links_added = 0
+        for page_num, page_links in links_by_page.items():
+            page = master_doc[page_num]
+            for rect, target_page_global in page_links:
+                link_rect = fitz.Rect(rect.x0, rect.y0, rect.x1, rect.y1)
+                page.insert_link({
+                    "from": link_rect,
+                    "kind": fitz.LINK_GOTO,
+                    "page": target_page_global,
+                    "to": fitz.Point(0, 0)
+                })
+            links_added += len(page_links)
         
         # Save master PDF
         master_doc.save(str(master_path))
@@ -601,19 +846,17 @@ class FerranteBlueprint:
 
     def _get_global_page_number(self, source_file: str, source_page: int, brief_paths: List[str]) -> int:
         """Calculate global page number in master PDF"""
-        page_offset = 0
-        
-        for i, brief_path in enumerate(brief_paths):
-            brief_filename = Path(brief_path).name
-            if source_file == brief_filename:
-                return page_offset + source_page - 1
-            
-            # Add page count of this brief
-            doc = fitz.open(brief_path)
-            page_offset += len(doc)
-            doc.close()
-        
-        return -1  # Not found
+        if not self._brief_offsets:
+            # Called outside step 7: count Brief pages once
+            page_offset = 0
+            for brief_path in brief_paths:
+                self._brief_offsets.setdefault(Path(brief_path).name, page_offset)
+                page_offset += len(self._source_doc(brief_path))
+        
+        page_offset = self._brief_offsets.get(source_file)
+        if page_offset is None:
+            return -1  # Not found
+        return page_offset + source_page - 1
 
     def step_8_validate(self, master_pdf_path: str, references: List[HyperlinkReference]) -> ValidationReport:
         """8) Automated validation"""
@@ -635,11 +878,10 @@ class FerranteBlueprint:
                 exceptions += 1
         
         # Check for broken links (simplified)
-        for page_num in range(len(doc)):
-            page = doc[page_num]
-            links = page.get_links()
-            for link in links:
-                if link.get("page", -1) >= len(doc):
+        page_count = len(doc)
+        for page in doc.pages():
+            for link in page.get_links():
+                if link.get("page", -1) >= page_count:
                     broken_links += 1
         
         doc.close()
@@ -674,29 +916,33 @@ class FerranteBlueprint:
         """Execute complete 100% accurate pipeline"""
         print("🚀 Starting Complete 100% Accurate Hyperlink Detection Pipeline...")
         
-        # Step 1: Preflight
-        normalized_briefs = self.step_1_preflight(brief_paths)
-        normalized_tr = self.step_1_preflight([trial_record_path])[0]
+        try:
+            # Step 1: Preflight
+            normalized_briefs = self.step_1_preflight(brief_paths)
+            normalized_tr = self.step_1_preflight([trial_record_path])[0]
         
-        # Step 2: Anchor Trial Record
-        anchors = self.step_2_anchor_trial_record(normalized_tr)
+            # Step 2: Anchor Trial Record
+            anchors = self.step_2_anchor_trial_record(normalized_tr)
         
-        # Step 3: Detect References
-        references = self.step_3_detect_references(normalized_briefs)
+            # Step 3: Detect References
+            references = self.step_3_detect_references(normalized_briefs)
         
-        # Step 4: Map Destinations
-        references = self.step_4_map_destinations(references)
+            # Step 4: Map Destinations
+            references = self.step_4_map_destinations(references)
         
-        # Step 5: Export Candidate Map
-        json_path, csv_path = self.step_5_export_candidate_map(references)
+            # Step 5: Export Candidate Map
+            json_path, csv_path = self.step_5_export_candidate_map(references)
         
-        # Step 6: Build Master PDF
-        master_pdf_path = self.step_6_build_master_pdf(
-            normalized_briefs, normalized_tr, references, min_confidence
-        )
+            # Step 6: Build Master PDF
+            master_pdf_path = self.step_6_build_master_pdf(
+                normalized_briefs, normalized_tr, references, min_confidence
+            )
         
-        # Step 7: Validate
-        validation_report = self.step_7_validate(master_pdf_path, references)
+            # Step 7: Validate
+            validation_report = self.step_7_validate(master_pdf_path, references)
+        finally:
+            # Steps share open source PDFs; release them even when a step fails
+            self._close_source_docs()
         
         # Final summary
         results = {
@@ -721,4 +967,23 @@ class FerranteBlueprint:
         print(f"   ⚠️  Needs Review: {results['needs_review']}")
         print(f"   📖 Master PDF: {Path(master_pdf_path).name}")
         
-        return results
\ No newline at end of file
+        return results
+
+
+# Per-worker open documents for parallel page scanning
+_worker_docs: Dict[str, fitz.Document] = {}
+
+def _worker_doc(pdf_path: str) -> fitz.Document:
+    """Open a document once per worker process"""
+    doc = _worker_docs.get(pdf_path)
+    if doc is None:
+        doc = _worker_docs[pdf_path] = fitz.open(pdf_path)
+    return doc
+
+def _scan_brief_page(pdf_path: str, page_num: int, filename: str) -> List[HyperlinkReference]:
+    """Process-pool worker: detect references on one Brief page"""
+    return FerranteBlueprint._detect_page_references(_worker_doc(pdf_path)[page_num], page_num, filename)
+
+def _anchor_page_text(trial_record_path: str, page_num: int) -> str:
+    """Process-pool worker: lower-cased text of one Trial Record page"""
+    return _worker_doc(trial_record_path)[page_num].get_text("text", sort=False, flags=_SCAN_TEXT_FLAGS).lower()
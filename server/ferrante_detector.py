@@ -3,9 +3,15 @@
 Implements exact patterns specified for legal document cross-references
 """
 import re
+from bisect import bisect_right
+from functools import lru_cache
 import fitz  # PyMuPDF
 from typing import List, Dict, Tuple, Optional
 import json
+try:
+    import orjson  # Optional: faster serializer when installed
+except ImportError:
+    orjson = None
 import csv
 from pathlib import Path
 
@@ -43,29 +49,83 @@ class FerranteHyperlinkDetector:
         'refusal': re.compile(r'\brefusal(s)?\b', re.IGNORECASE),
         'under_advisement': re.compile(r'\bunder advisement\b', re.IGNORECASE)
     }
+    
+    # Every pattern starts with \b and a keyword: one scan for the keywords finds all candidate starts.
+    # (?<!\w) is \b before a letter; the lookahead on initials lets most positions fail fast.
+    TRIGGER_PATTERN = re.compile(
+        r'(?<!\w)(?=[aerstu])(?:(?P<exhibit>exhibit)|(?P<tab>tab)|(?P<schedule>schedule)|(?P<affidavit>affidavit)'
+        r'|(?P<under>under)|(?P<refusal>refusal))',
+        re.IGNORECASE
+    )
+    TRIGGER_TYPES = {
+        'exhibit': ('exhibit',),
+        'tab': ('tab',),
+        'schedule': ('schedule',),
+        'affidavit': ('affidavit',),
+        'under': ('undertaking', 'under_advisement'),
+        'refusal': ('refusal',)
+    }
+    
+    # Trial Record inverted indexes: keyword -> pages, and the values that follow a keyword -> pages
+    TR_TERMS = ('exhibit', 'tab', 'schedule', 'affidavit', 'undertaking', 'refusal', 'under advisement')
+    TR_VALUE_PATTERNS = {
+        'exhibit': re.compile(r'(?=exhibit ([^ :\n]+)[: \n])'),  # exact "exhibit {v}:" / "exhibit {v} " / "exhibit {v}\n"
+        'tab': re.compile(r'(?=tab (.{1,3}))'),
+        'schedule': re.compile(r'(?=schedule (.{1,3}))')
+    }
+    # Types matched by value prefix ("tab {v}" in page_text), indexed up to the longest value PATTERNS can capture
+    TR_PREFIX_TYPES = ('tab', 'schedule')
+    TR_VALUE_PREFIX_LEN = 3
+    # Keyword every non-zero confidence of a reference type requires
+    SCORE_TERMS = {
+        'exhibit': 'exhibit',
+        'tab': 'tab',
+        'schedule': 'schedule',
+        'affidavit': 'affidavit',
+        'undertaking': 'undertaking',
+        'refusal': 'refusal',
+        'under_advisement': 'under advisement'
+    }
+    # Types scored on their keyword alone, so every page with it scores the same
+    SECTION_TYPES = ('undertaking', 'refusal', 'under_advisement')
+
+    # Candidate-map CSV header: the reference, then its top 3 destination candidates
+    CANDIDATE_MAP_COLUMNS = (
+        'source_file', 'source_page', 'ref_type', 'ref_value', 'snippet',
+        'top_dest_page', 'top_confidence', 'top_method',
+        'alt_dest_1', 'alt_confidence_1', 'alt_method_1',
+        'alt_dest_2', 'alt_confidence_2', 'alt_method_2'
+    )
 
     def __init__(self):
         self.trial_record_index = {}
+        self.tr_term_pages = {}
+        self.tr_value_pages = {}
+        self.tr_text = ""
+        self.tr_page_starts = []
+        self.tr_needle_pages = {}
         
-    def detect_references_in_pdf(self, pdf_path: str, filename: str) -> List[HyperlinkReference]:
-        """Extract all internal references from a PDF with exact coordinates"""
+    def detect_references_in_pdf(self, pdf_path: str, filename: str,
+                                 doc: Optional[fitz.Document] = None) -> List[HyperlinkReference]:
+        """Extract all internal references from a PDF with exact coordinates (doc: an already-open pdf_path)"""
         references = []
-        doc = fitz.open(pdf_path)
+        owns_doc = doc is None
+        if owns_doc:
+            doc = fitz.open(pdf_path)
         
         for page_num in range(len(doc)):
             page = doc[page_num]
-            text_instances = page.get_text("dict")
             
-            # Extract text with coordinates
-            full_page_text = page.get_text()
+            # One rawdict walk gives the page text and the rectangle of every character in it
+            full_page_text, char_rects = self._build_char_rect_map(page)
             
-            for ref_type, pattern in self.PATTERNS.items():
-                for match in pattern.finditer(full_page_text):
+            for ref_type, matches in self._match_patterns(full_page_text).items():
+                for match in matches:
                     ref_value = match.group(1) if match.lastindex else match.group(0)
                     
                     # Get precise coordinates for the match
                     match_start, match_end = match.span()
-                    coords = self._get_text_coordinates(page, match.group(0), match_start)
+                    coords = self._get_text_coordinates(char_rects, match_start, match_end)
                     
                     if coords:
                         snippet = self._get_context_snippet(full_page_text, match_start, 60)
@@ -80,16 +140,59 @@ class FerranteHyperlinkDetector:
                         )
                         references.append(reference)
         
-        doc.close()
+        if owns_doc:
+            doc.close()
         return references
 
-    def _get_text_coordinates(self, page, text: str, text_start: int) -> Optional[Tuple[float, float, float, float]]:
-        """Get precise coordinates for text placement"""
-        text_instances = page.search_for(text)
-        if text_instances:
-            rect = text_instances[0]  # Take first occurrence
-            return (rect.x0, rect.y0, rect.x1, rect.y1)
-        return None
+    def _match_patterns(self, page_text: str) -> Dict[str, List[re.Match]]:
+        """Per-type PATTERNS matches, identical to running each pattern's finditer, in one text scan"""
+        matches_by_type = {ref_type: [] for ref_type in self.PATTERNS}
+        match_ends = dict.fromkeys(self.PATTERNS, 0)
+        
+        for trigger in self.TRIGGER_PATTERN.finditer(page_text):
+            start = trigger.start()
+            for ref_type in self.TRIGGER_TYPES[trigger.lastgroup]:
+                # finditer never starts a match inside the same pattern's previous match
+                if start < match_ends[ref_type]:
+                    continue
+                match = self.PATTERNS[ref_type].match(page_text, start)
+                if match:
+                    matches_by_type[ref_type].append(match)
+                    match_ends[ref_type] = match.end()
+        
+        return matches_by_type
+
+    def _build_char_rect_map(self, page) -> Tuple[str, List[Optional[Tuple[float, float, float, float]]]]:
+        """Page text as get_text() returns it, with each character's bbox at its text offset"""
+        chars = []
+        char_rects = []
+        for block in page.get_text("rawdict")["blocks"]:
+            if block["type"] != 0:
+                continue
+            for line in block["lines"]:
+                for span in line["spans"]:
+                    for char in span["chars"]:
+                        chars.append(char["c"])
+                        char_rects.append(char["bbox"])
+                # Line breaks have no rectangle
+                chars.append("\n")
+                char_rects.append(None)
+        return "".join(chars), char_rects
+
+    def _get_text_coordinates(self, char_rects: List[Optional[Tuple[float, float, float, float]]], start: int,
+                              end: int) -> Optional[Tuple[float, float, float, float]]:
+        """Get precise coordinates of the match at text offsets start:end (its first line)"""
+        line_rects = []
+        for rect in char_rects[start:end]:
+            if rect is None:
+                break
+            line_rects.append(rect)
+        if not line_rects:
+            return None
+        # Union as fitz.Rect's | computes it: empty (zero-width) boxes do not widen the result
+        boxes = [rect for rect in line_rects if rect[0] < rect[2] and rect[1] < rect[3]] or line_rects[:1]
+        return (min(box[0] for box in boxes), min(box[1] for box in boxes),
+                max(box[2] for box in boxes), max(box[3] for box in boxes))
 
     def _get_context_snippet(self, text: str, match_index: int, context_length: int) -> str:
         """Extract context around the match"""
@@ -97,76 +200,148 @@ class FerranteHyperlinkDetector:
         end = min(len(text), match_index + context_length)
         return text[start:end].strip()
 
-    def build_trial_record_index(self, trial_record_path: str) -> Dict[int, str]:
-        """Build searchable index of Trial Record pages"""
+    def build_trial_record_index(self, trial_record_path: str, doc: Optional[fitz.Document] = None) -> Dict[int, str]:
+        """Build searchable index of Trial Record pages (doc: an already-open trial_record_path)"""
         index = {}
-        doc = fitz.open(trial_record_path)
+        term_pages = {term: [] for term in self.TR_TERMS}
+        value_pages = {ref_type: {} for ref_type in self.TR_VALUE_PATTERNS}
+        owns_doc = doc is None
+        if owns_doc:
+            doc = fitz.open(trial_record_path)
         
         for page_num in range(len(doc)):
             page = doc[page_num]
             page_text = page.get_text().lower()
             index[page_num + 1] = page_text
             
-        doc.close()
+            # Inverted indexes so candidate search only visits pages that can match
+            for term, pages in term_pages.items():
+                if term in page_text:
+                    pages.append(page_num + 1)
+            for ref_type, pattern in self.TR_VALUE_PATTERNS.items():
+                values = set(pattern.findall(page_text))
+                if ref_type in self.TR_PREFIX_TYPES:
+                    values = {value[:length] for value in values for length in range(1, len(value) + 1)}
+                for value in values:
+                    value_pages[ref_type].setdefault(value, []).append(page_num + 1)
+            
+        if owns_doc:
+            doc.close()
         self.trial_record_index = index
+        self.tr_term_pages = term_pages
+        self.tr_value_pages = value_pages
+        
+        # All pages in one buffer (\x01-separated) so a value is located with C-level finds, not a scan per page
+        self.tr_page_starts = []
+        offset = 0
+        for page_text in index.values():
+            self.tr_page_starts.append(offset)
+            offset += len(page_text) + 1
+        self.tr_text = "\x01".join(index.values())
+        self.tr_needle_pages = {}
         return index
 
     def find_destination_candidates(self, reference: HyperlinkReference) -> List[DestinationCandidate]:
         """Find top 3 destination candidates for a reference"""
-        candidates = []
+        scored = []
         
-        for page_num, page_text in self.trial_record_index.items():
-            confidence, method = self._calculate_match_confidence(reference, page_text)
+        for page_num in self._candidate_pages(reference):
+            confidence, method = self._calculate_match_confidence(reference, self.trial_record_index[page_num])
             
             if confidence > 0:
-                preview = self._get_preview_text(page_text, reference)
-                candidate = DestinationCandidate(page_num, confidence, method, preview)
-                candidates.append(candidate)
+                scored.append((page_num, confidence, method))
         
         # Sort by confidence (desc) then by page number (asc)
-        candidates.sort(key=lambda x: (-x.confidence, x.dest_page))
-        return candidates[:3]  # Top 3 candidates
+        scored.sort(key=lambda x: (-x[1], x[0]))
+        
+        # Preview text only for the kept candidates
+        return [
+            DestinationCandidate(page_num, confidence, method,
+                                 self._get_preview_text(self.trial_record_index[page_num], reference))
+            for page_num, confidence, method in scored[:3]  # Top 3 candidates
+        ]
+
+    def _candidate_pages(self, reference: HyperlinkReference) -> List[int]:
+        """Trial Record pages that can score above zero for a reference, via the inverted indexes"""
+        term = self.SCORE_TERMS.get(reference.ref_type)
+        if term is None:
+            return []
+        if not self.tr_term_pages:
+            # Index assigned without build_trial_record_index: scan every page
+            return list(self.trial_record_index)
+        
+        # Exact matches are the only 1.0 scores: three of them already fill the top 3
+        if reference.ref_type in self.SECTION_TYPES:
+            # Equal scores sort by page: the first three keyword pages are the top 3, no page needs scoring
+            return self.tr_term_pages[term][:3]
+        
+        ref_value = reference.ref_value.lower()
+        exact_pages = self.tr_value_pages.get(reference.ref_type, {}).get(ref_value, [])
+        if len(exact_pages) >= 3:
+            return exact_pages[:3]
+        
+        pages = self.tr_term_pages[term]
+        if reference.ref_type in self.TR_VALUE_PATTERNS:
+            # Exact and token scores both need the value itself on the page
+            value_pages = set(self._pages_containing(ref_value))
+            pages = [page_num for page_num in pages if page_num in value_pages]
+        elif reference.ref_type == 'affidavit' and ref_value.split():
+            # Both scores need at least one name part on the page: union of each part's pages
+            name_pages = set()
+            for part in ref_value.split():
+                name_pages.update(self._pages_containing(part))
+            pages = [page_num for page_num in pages if page_num in name_pages]
+        return pages
+
+    def _pages_containing(self, needle: str) -> List[int]:
+        """Trial Record pages whose text contains needle, one find per matching page over tr_text"""
+        pages = self.tr_needle_pages.get(needle)
+        if pages is None:
+            pages = []
+            page_count = len(self.tr_page_starts)
+            hit = self.tr_text.find(needle)
+            while hit != -1:
+                page_index = bisect_right(self.tr_page_starts, hit) - 1
+                pages.append(page_index + 1)
+                if page_index + 1 == page_count:
+                    break
+                # Resume at the next page; one hit per page is enough
+                hit = self.tr_text.find(needle, self.tr_page_starts[page_index + 1])
+            self.tr_needle_pages[needle] = pages
+        return pages
+
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def _match_literals(ref_type: str, ref_value: str) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+        """Exact-match phrases and token strings for a reference, built once rather than per page"""
+        ref_value = ref_value.lower()
+        if ref_type == 'exhibit':
+            return (f"exhibit {ref_value}:", f"exhibit {ref_value} ", f"exhibit {ref_value}\n"), (ref_value,)
+        if ref_type in ('tab', 'schedule'):
+            return (f"{ref_type} {ref_value}",), (ref_value,)
+        if ref_type == 'affidavit':
+            return (f"affidavit of {ref_value}",), tuple(ref_value.split())
+        return (), ()
 
     def _calculate_match_confidence(self, reference: HyperlinkReference, page_text: str) -> Tuple[float, str]:
         """Calculate confidence score with exact method identification"""
         ref_type = reference.ref_type
-        ref_value = reference.ref_value.lower()
+        exact_literals, token_literals = self._match_literals(ref_type, reference.ref_value)
         
-        if ref_type == 'exhibit':
-            # Exact exhibit match
-            exact_patterns = [
-                f"exhibit {ref_value}:",
-                f"exhibit {ref_value} ",
-                f"exhibit {ref_value}\n"
-            ]
-            for pattern in exact_patterns:
-                if pattern in page_text:
-                    return 1.0, "exact_exhibit"
-            
-            # Token match
-            if f"exhibit" in page_text and ref_value in page_text:
-                return 0.85, "token_exhibit"
-                
-        elif ref_type == 'tab':
-            if f"tab {ref_value}" in page_text:
-                return 1.0, "exact_tab"
-            if "tab" in page_text and ref_value in page_text:
-                return 0.85, "token_tab"
-                
-        elif ref_type == 'schedule':
-            if f"schedule {ref_value}" in page_text:
-                return 1.0, "exact_schedule"
-            if "schedule" in page_text and ref_value in page_text:
-                return 0.85, "token_schedule"
+        if ref_type in ('exhibit', 'tab', 'schedule'):
+            # Exact match, then keyword plus value anywhere on the page
+            if any(literal in page_text for literal in exact_literals):
+                return 1.0, f"exact_{ref_type}"
+            if ref_type in page_text and token_literals[0] in page_text:
+                return 0.85, f"token_{ref_type}"
                 
         elif ref_type == 'affidavit':
-            name_parts = ref_value.lower().split()
-            if f"affidavit of {ref_value.lower()}" in page_text:
+            if exact_literals[0] in page_text:
                 return 1.0, "exact_affidavit"
-            if "affidavit" in page_text and any(part in page_text for part in name_parts):
+            if "affidavit" in page_text and any(part in page_text for part in token_literals):
                 return 0.90, "token_affidavit"
                 
-        elif ref_type in ['undertaking', 'refusal', 'under_advisement']:
+        elif ref_type in self.SECTION_TYPES:
             section_key = ref_type.replace('_', ' ')
             if section_key in page_text:
                 return 0.80, "section_match"
@@ -207,31 +382,10 @@ class FerranteHyperlinkDetector:
         csv_path = Path(output_dir) / "Ferrante_candidate_hyperlink_map.csv"
         with open(csv_path, 'w', newline='', encoding='utf-8') as f:
             writer = csv.writer(f)
-            writer.writerow([
-                'source_file', 'source_page', 'ref_type', 'ref_value', 'snippet',
-                'top_dest_page', 'top_confidence', 'top_method',
-                'alt_dest_1', 'alt_confidence_1', 'alt_method_1',
-                'alt_dest_2', 'alt_confidence_2', 'alt_method_2'
-            ])
+            writer.writerow(self.CANDIDATE_MAP_COLUMNS)
             
-            for mapping in mappings:
-                ref = mapping.reference
-                candidates = mapping.candidates
-                
-                row = [
-                    ref.source_file, ref.source_page, ref.ref_type, ref.ref_value, 
-                    f'"{ref.snippet}"',
-                    candidates[0].dest_page if candidates else '',
-                    candidates[0].confidence if candidates else '',
-                    candidates[0].method if candidates else '',
-                    candidates[1].dest_page if len(candidates) > 1 else '',
-                    candidates[1].confidence if len(candidates) > 1 else '',
-                    candidates[1].method if len(candidates) > 1 else '',
-                    candidates[2].dest_page if len(candidates) > 2 else '',
-                    candidates[2].confidence if len(candidates) > 2 else '',
-                    candidates[2].method if len(candidates) > 2 else ''
-                ]
-                writer.writerow(row)
+            # Rows built in one pass, then handed to the writer in a single call
+            writer.writerows(self._csv_row(mapping) for mapping in mappings)
         
         # Export JSON
         json_path = Path(output_dir) / "Ferrante_candidate_hyperlink_map.json"
@@ -242,34 +396,45 @@ class FerranteHyperlinkDetector:
             "by_type": self._count_by_type(mappings),
             "high_confidence": len([m for m in mappings if m.top_candidate and m.top_candidate.confidence >= 0.92]),
             "needs_review": len([m for m in mappings if m.top_candidate and m.top_candidate.confidence < 0.92]),
-            "mappings": []
+            "mappings": [
+                {
+                    "source_file": mapping.reference.source_file,
+                    "source_page": mapping.reference.source_page,
+                    "ref_type": mapping.reference.ref_type,
+                    "ref_value": mapping.reference.ref_value,
+                    "snippet": mapping.reference.snippet,
+                    "coordinates": mapping.reference.coordinates,
+                    "candidates": [
+                        {
+                            "dest_page": c.dest_page,
+                            "confidence": c.confidence,
+                            "method": c.method,
+                            "preview_text": c.preview_text
+                        } for c in mapping.candidates
+                    ]
+                } for mapping in mappings
+            ]
         }
         
-        for mapping in mappings:
-            ref = mapping.reference
-            mapping_data = {
-                "source_file": ref.source_file,
-                "source_page": ref.source_page,
-                "ref_type": ref.ref_type,
-                "ref_value": ref.ref_value,
-                "snippet": ref.snippet,
-                "coordinates": ref.coordinates,
-                "candidates": [
-                    {
-                        "dest_page": c.dest_page,
-                        "confidence": c.confidence,
-                        "method": c.method,
-                        "preview_text": c.preview_text
-                    } for c in mapping.candidates
-                ]
-            }
-            json_data["mappings"].append(mapping_data)
-        
-        with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(json_data, f, indent=2, ensure_ascii=False)
+        if orjson is not None:
+            with open(json_path, 'wb') as f:
+                f.write(orjson.dumps(json_data, option=orjson.OPT_INDENT_2))
+        else:
+            with open(json_path, 'w', encoding='utf-8') as f:
+                json.dump(json_data, f, indent=2, ensure_ascii=False)
         
         return str(csv_path), str(json_path)
 
+    @staticmethod
+    def _csv_row(mapping: HyperlinkMapping) -> list:
+        """Candidate-map CSV row: reference fields, then top 3 candidates padded with blanks"""
+        ref = mapping.reference
+        row = [ref.source_file, ref.source_page, ref.ref_type, ref.ref_value, f'"{ref.snippet}"']
+        for candidate in mapping.candidates[:3]:
+            row += [candidate.dest_page, candidate.confidence, candidate.method]
+        row += [''] * (len(FerranteHyperlinkDetector.CANDIDATE_MAP_COLUMNS) - len(row))
+        return row
+
     def _count_by_type(self, mappings: List[HyperlinkMapping]) -> Dict[str, int]:
         """Count references by type"""
         counts = {}
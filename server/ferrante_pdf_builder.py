@@ -3,39 +3,51 @@ Master PDF Builder with Internal Hyperlinks
 Creates a single court-ready PDF with all hyperlinks working internally
 """
 import fitz  # PyMuPDF
+import os
 from pathlib import Path
-from typing import List
-from ferrante_detector import HyperlinkMapping, HyperlinkReference
+from typing import Dict, List, Optional
+from concurrent.futures import ProcessPoolExecutor
+from ferrante_detector import FerranteHyperlinkDetector, HyperlinkMapping, HyperlinkReference
+
+# PyMuPDF text extraction stops scaling past a handful of processes
+MAX_BRIEF_WORKERS = 6
 
 class FerranteMasterPDFBuilder:
     def __init__(self):
         self.doc = None
         self.brief_page_count = 0
         self.trial_record_offset = 0
+        self.brief_offsets: Dict[str, int] = {}
 
     def build_master_pdf_with_links(self, brief_paths: List[str], trial_record_path: str, 
                                    mappings: List[HyperlinkMapping], output_path: str,
-                                   min_confidence: float = 0.5) -> str:
-        """Build master PDF with internal hyperlinks"""
+                                   min_confidence: float = 0.5,
+                                   source_docs: Optional[Dict[str, fitz.Document]] = None) -> str:
+        """Build master PDF with internal hyperlinks (source_docs: already-open PDFs by path, left open)"""
+        source_docs = source_docs or {}
         
         # Create new document
         self.doc = fitz.open()
         
-        # Add Brief documents first
+        # Add Brief documents first, recording where each one starts
         brief_page_offset = 0
+        self.brief_offsets = {}
         for brief_path in brief_paths:
-            brief_doc = fitz.open(brief_path)
+            brief_doc = source_docs.get(brief_path) or fitz.open(brief_path)
+            self.brief_offsets[Path(brief_path).name] = brief_page_offset
             self.doc.insert_pdf(brief_doc)
             brief_page_offset += len(brief_doc)
-            brief_doc.close()
+            if brief_path not in source_docs:
+                brief_doc.close()
         
         self.brief_page_count = brief_page_offset
         
         # Add Trial Record
-        trial_doc = fitz.open(trial_record_path)
+        trial_doc = source_docs.get(trial_record_path) or fitz.open(trial_record_path)
         self.doc.insert_pdf(trial_doc)
         self.trial_record_offset = brief_page_offset
-        trial_doc.close()
+        if trial_record_path not in source_docs:
+            trial_doc.close()
         
         # Insert hyperlinks
         self._insert_hyperlinks(mappings, min_confidence)
@@ -49,6 +61,8 @@ class FerranteMasterPDFBuilder:
     def _insert_hyperlinks(self, mappings: List[HyperlinkMapping], min_confidence: float):
         """Insert hyperlinks into the master PDF"""
         
+        # Group links by source page so each master page is loaded once
+        links_by_page = {}
         for mapping in mappings:
             if not mapping.top_candidate or mapping.top_candidate.confidence < min_confidence:
                 continue
@@ -60,94 +74,106 @@ class FerranteMasterPDFBuilder:
             source_page_num = self._find_source_page_in_master(ref.source_file, ref.source_page)
             
             if source_page_num is not None and source_page_num < len(self.doc):
-                page = self.doc[source_page_num]
-                
-                # Create internal link annotation
-                link_rect = fitz.Rect(*ref.coordinates)
-                
-                # Create link annotation that goes to target page
-                link = {
-                    "kind": fitz.LINK_GOTO,
-                    "page": target_page,
-                    "to": fitz.Point(0, 0)  # Top of target page
-                }
-                
-                # Add the link annotation
+                links_by_page.setdefault(source_page_num, []).append((ref.coordinates, target_page))
+        
+        for source_page_num, page_links in links_by_page.items():
+            page = self.doc[source_page_num]
+            for coordinates, target_page in page_links:
+                # Internal link annotation to the top of the target page
                 page.insert_link({
-                    "from": link_rect,
+                    "from": fitz.Rect(*coordinates),
                     "kind": fitz.LINK_GOTO,
                     "page": target_page,
                     "to": fitz.Point(0, 0)
                 })
 
-    def _find_source_page_in_master(self, source_file: str, source_page: int) -> int:
+    def _find_source_page_in_master(self, source_file: str, source_page: int) -> Optional[int]:
         """Find the page number in master PDF for a source reference"""
-        
-        # Determine which brief this comes from
-        if "Amended Doc Brief" in source_file:
-            # First brief - pages start at 0
-            return source_page - 1
-        elif "Amended Supp Doc Brief" in source_file:
-            # Second brief - need to find where it starts
-            # For now, assuming it's the second document added
-            # This would need to be calculated based on first brief length
-            return source_page - 1  # Simplified - would need actual calculation
-        
-        return None
+        brief_offset = self.brief_offsets.get(source_file)
+        if brief_offset is None:
+            return None
+        return brief_offset + source_page - 1
 
 class FerranteProcessor:
     """Complete end-to-end processor for Ferrante case"""
     
     def __init__(self):
-        from ferrante_detector import FerranteHyperlinkDetector
         self.detector = FerranteHyperlinkDetector()
         self.pdf_builder = FerranteMasterPDFBuilder()
+        self._source_docs: Dict[str, fitz.Document] = {}
+    
+    def _source_doc(self, pdf_path: str) -> fitz.Document:
+        """Open a source PDF once per run; later steps reuse the already-parsed document"""
+        doc = self._source_docs.get(pdf_path)
+        if doc is None:
+            doc = self._source_docs[pdf_path] = fitz.open(pdf_path)
+        return doc
+    
+    def _close_source_docs(self):
+        """Release the source PDFs opened during this run"""
+        for doc in self._source_docs.values():
+            doc.close()
+        self._source_docs = {}
     
     def process_ferrante_case(self, brief_paths: List[str], trial_record_path: str, 
                              output_dir: str, min_confidence: float = 0.5) -> dict:
         """Complete processing pipeline"""
         
-        print("🔍 Detecting references in Brief documents...")
-        all_references = []
-        
-        for brief_path in brief_paths:
-            filename = Path(brief_path).name
-            references = self.detector.detect_references_in_pdf(brief_path, filename)
-            all_references.extend(references)
-            print(f"   Found {len(references)} references in {filename}")
-        
-        print(f"📊 Total references found: {len(all_references)}")
-        
-        # Count by type
-        by_type = {}
-        for ref in all_references:
-            by_type[ref.ref_type] = by_type.get(ref.ref_type, 0) + 1
-        
-        print("📋 References by type:")
-        for ref_type, count in by_type.items():
-            print(f"   {ref_type}: {count}")
-        
-        print("🗂️  Building Trial Record index...")
-        self.detector.build_trial_record_index(trial_record_path)
-        
-        print("🎯 Mapping references to destinations...")
-        mappings = self.detector.map_references_to_destinations(all_references)
-        
-        # Confidence analysis
-        high_confidence = len([m for m in mappings if m.top_candidate and m.top_candidate.confidence >= 0.92])
-        needs_review = len([m for m in mappings if m.top_candidate and m.top_candidate.confidence < 0.92])
-        
-        print(f"✅ High confidence (≥92%): {high_confidence}")
-        print(f"⚠️  Needs review (<92%): {needs_review}")
-        
-        print("📁 Exporting candidate maps...")
-        csv_path, json_path = self.detector.export_candidate_map(mappings, output_dir)
-        
-        print("📖 Building master PDF with hyperlinks...")
-        master_pdf_path = Path(output_dir) / "Ferrante_Master.linked.pdf"
-        self.pdf_builder.build_master_pdf_with_links(
-            brief_paths, trial_record_path, mappings, str(master_pdf_path), min_confidence
-        )
+        try:
+            print("🔍 Detecting references in Brief documents...")
+            all_references = []
+        
+            if len(brief_paths) > 1:
+                # Briefs are independent; scan them across processes and merge in input order
+                workers = min(len(brief_paths), os.cpu_count() or 1, MAX_BRIEF_WORKERS)
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    brief_references = list(executor.map(_scan_one, brief_paths))
+            else:
+                brief_references = [
+                    self.detector.detect_references_in_pdf(brief_path, Path(brief_path).name, self._source_doc(brief_path))
+                    for brief_path in brief_paths
+                ]
+        
+            for brief_path, references in zip(brief_paths, brief_references):
+                all_references.extend(references)
+                print(f"   Found {len(references)} references in {Path(brief_path).name}")
+        
+            print(f"📊 Total references found: {len(all_references)}")
+        
+            # Count by type
+            by_type = {}
+            for ref in all_references:
+                by_type[ref.ref_type] = by_type.get(ref.ref_type, 0) + 1
+        
+            print("📋 References by type:")
+            for ref_type, count in by_type.items():
+                print(f"   {ref_type}: {count}")
+        
+            print("🗂️  Building Trial Record index...")
+            self.detector.build_trial_record_index(trial_record_path, self._source_doc(trial_record_path))
+        
+            print("🎯 Mapping references to destinations...")
+            mappings = self.detector.map_references_to_destinations(all_references)
+        
+            # Confidence analysis
+            high_confidence = len([m for m in mappings if m.top_candidate and m.top_candidate.confidence >= 0.92])
+            needs_review = len([m for m in mappings if m.top_candidate and m.top_candidate.confidence < 0.92])
+        
+            print(f"✅ High confidence (≥92%): {high_confidence}")
+            print(f"⚠️  Needs review (<92%): {needs_review}")
+        
+            print("📁 Exporting candidate maps...")
+            csv_path, json_path = self.detector.export_candidate_map(mappings, output_dir)
+        
+            print("📖 Building master PDF with hyperlinks...")
+            master_pdf_path = Path(output_dir) / "Ferrante_Master.linked.pdf"
+            self.pdf_builder.build_master_pdf_with_links(
+                brief_paths, trial_record_path, mappings, str(master_pdf_path), min_confidence,
+                {path: self._source_doc(path) for path in [*brief_paths, trial_record_path]}
+            )
+        finally:
+            # Steps share open source PDFs; release them even when a step fails
+            self._close_source_docs()
         
         print("✅ Processing complete!")
         
@@ -160,4 +186,9 @@ class FerranteProcessor:
             "candidate_map_csv": csv_path,
             "candidate_map_json": json_path,
             "mappings": mappings
-        }
\ No newline at end of file
+        }
+
+
+def _scan_one(brief_path: str) -> List[HyperlinkReference]:
+    """Process-pool worker: detect references in one Brief with its own detector"""
+    return FerranteHyperlinkDetector().detect_references_in_pdf(brief_path, Path(brief_path).name)
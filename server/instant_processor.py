@@ -7,7 +7,12 @@ from fastapi import FastAPI, File, UploadFile, Form, HTTPException
 from fastapi.responses import FileResponse, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 import fitz  # PyMuPDF
+import asyncio
 import json
+try:
+    import orjson  # Optional: faster serializer when installed
+except ImportError:
+    orjson = None
 import os
 import tempfile
 import shutil
@@ -33,6 +38,14 @@ app.add_middleware(
 OUTPUT_DIR = Path("data/out")
 OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
+# Uploads are copied to disk in chunks of this size
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+def _save_upload(upload: UploadFile, path: Path):
+    """Stream an upload's spooled file to disk chunk by chunk instead of reading it whole"""
+    with open(path, "wb") as f:
+        shutil.copyfileobj(upload.file, f, UPLOAD_CHUNK_SIZE)
+
 @app.get("/")
 async def root():
     return {
@@ -83,18 +96,14 @@ async def instant_process(
                     raise HTTPException(status_code=400, detail=f"Brief file {i+1} must be PDF")
                 
                 brief_path = temp_path / f"brief_{i+1}_{brief_file.filename}"
-                with open(brief_path, "wb") as f:
-                    content = await brief_file.read()
-                    f.write(content)
+                await asyncio.to_thread(_save_upload, brief_file, brief_path)
                 brief_paths.append(str(brief_path))
             
             if not trial_record.filename.endswith('.pdf'):
                 raise HTTPException(status_code=400, detail="Trial record must be PDF")
             
             trial_record_path = temp_path / f"trial_record_{trial_record.filename}"
-            with open(trial_record_path, "wb") as f:
-                content = await trial_record.read()
-                f.write(content)
+            await asyncio.to_thread(_save_upload, trial_record, trial_record_path)
             
             # Process with deterministic pipeline
             detector = DeterministicHyperlinkDetector(str(OUTPUT_DIR))
@@ -142,8 +151,12 @@ async def instant_process(
             }
             
             # Save validation report
-            with open(OUTPUT_DIR / "validation_report.json", 'w') as f:
-                json.dump(validation_result, f, indent=2)
+            if orjson is not None:
+                with open(OUTPUT_DIR / "validation_report.json", 'wb') as f:
+                    f.write(orjson.dumps(validation_result, option=orjson.OPT_INDENT_2))
+            else:
+                with open(OUTPUT_DIR / "validation_report.json", 'w') as f:
+                    json.dump(validation_result, f, indent=2)
             
             return JSONResponse(content=result)
             
@@ -196,6 +209,9 @@ def validate_master_pdf(pdf_path: str) -> dict:
         link_details = []
         
         for page_num in range(total_pages):
+            # Pages without an /Annots entry carry no links: skip loading them
+            if doc.xref_get_key(doc.page_xref(page_num), "Annots")[0] == "null":
+                continue
             page = doc[page_num]
             links = page.get_links()
             
@@ -222,9 +238,9 @@ def validate_master_pdf(pdf_path: str) -> dict:
         
         doc.close()
         
-        # Calculate file hash for integrity
+        # Calculate file hash for integrity, streamed in blocks rather than read whole
         with open(pdf_path, 'rb') as f:
-            file_hash = hashlib.sha256(f.read()).hexdigest()
+            file_hash = hashlib.file_digest(f, 'sha256').hexdigest()
         
         validation_report = {
             "timestamp": datetime.now().isoformat(),
@@ -0,0 +1,41 @@
+"""
+Regression tests for DeterministicHyperlinkDetector reference extraction
+"""
+import sys
+from pathlib import Path
+
+import fitz  # PyMuPDF
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from deterministic_hyperlink_detector import DeterministicHyperlinkDetector
+
+OVERLAPPING_LINE = "the Affidavit of John Smith sworn and Exhibit C, with undertakings given"
+
+
+def test_match_patterns_keeps_matches_inside_an_affidavit_match():
+    """A greedy affidavit match must not hide the exhibit/undertaking references it spans"""
+    expected = {ref_type: [match.span() for match in pattern.finditer(OVERLAPPING_LINE)]
+                for ref_type, pattern in DeterministicHyperlinkDetector.PATTERNS.items()}
+    matches = DeterministicHyperlinkDetector._match_patterns(OVERLAPPING_LINE)
+
+    assert {ref_type: [match.span() for match in found] for ref_type, found in matches.items()} == expected
+    assert [match.group(1) for match in matches['exhibit']] == ['C']
+    assert len(matches['affidavit']) == 1
+    assert len(matches['undertaking']) == 1
+
+
+def test_extract_page_references_grouped_by_type():
+    """References come out per type in PATTERNS order, as separate finditer passes produced them"""
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((50, 72), OVERLAPPING_LINE, fontsize=9)
+
+    references = DeterministicHyperlinkDetector._extract_page_references(page, 0, "brief.pdf")
+    doc.close()
+
+    assert [(ref.ref_type, ref.ref_value) for ref in references] == [
+        ('exhibit', 'C'),
+        ('affidavit', 'John Smith sworn and Exhibit'),
+        ('undertaking', 's'),
+    ]